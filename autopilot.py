@@ -0,0 +1,411 @@
+# autopilot.py
+"""
+Autopilot for attract mode and soak tests: picks a direction every tick.
+
+Path finding is a BFS toward the food followed by a safety check that the
+head can still reach the tail after eating. It runs as a resumable generator
+that is sliced across ticks: one decision stops searching at the first
+slice boundary after `budget` seconds. While a search is running the snake
+follows a short, already verified stretch of cells (the "route": the escape
+path found by the previous search, or the Hamiltonian cycle) and the search
+plans from the end of that route, so its result is still valid when it
+arrives. The finished plan is cached and only recomputed when the food moves
+or the next planned cell is blocked.
+
+The body is never copied. The autopilot numbers the moves it sees and
+remembers the move each cell was last entered on, so how long a segment
+stays on the board is a single lookup; the search overlays the moves it
+plans (route, path) on top of that.
+
+Inside the search cells are flat indices (y * grid_width + x) into lists
+allocated once per Autopilot. A BFS only stamps the cells it reaches, so
+finishing or dropping a search frees nothing: releasing a per-search dict
+of a fullscreen board's cells took about 1 ms on its own.
+
+No pygame dependency; works on any SnakeEngine.
+"""
+import random
+import time
+from collections import deque
+from itertools import islice
+
+from engine import DIRECTIONS, OPPOSITES
+from profiler import percentile
+
+DECISION_BUDGET = 0.0005  # seconds of search per tick; the last slice and the fallback fit in 1 ms
+SLICE = 32                # BFS expansions between budget checks
+COPY_SLICE = 256          # path cells copied between budget checks
+MIN_LOOKAHEAD = 4         # route length (ticks) a search may take to finish
+MAX_LOOKAHEAD = 256
+ESCAPE_LIMIT = 4 * MAX_LOOKAHEAD  # escape cells kept for the next routes
+ROOM_LIMIT = 256          # cells the fallback counts per neighbour
+
+
+def hamiltonian_cycle(width, height):
+    """A cycle visiting every cell once (needs an even width or height), else None."""
+    if height % 2 == 0:
+        cycle = []
+        for y in range(height):
+            xs = range(1, width) if y % 2 == 0 else range(width - 1, 0, -1)
+            cycle += [(x, y) for x in xs]
+        return cycle + [(0, y) for y in range(height - 1, -1, -1)]
+    if width % 2 == 0:
+        return [(x, y) for y, x in hamiltonian_cycle(height, width)]
+    return None
+
+
+def _direction(src, dst):
+    delta = (dst[0] - src[0], dst[1] - src[1])
+    for name, d in DIRECTIONS.items():
+        if d == delta:
+            return name
+    return None
+
+
+class Autopilot:
+    def __init__(self, grid_width, grid_height, budget=DECISION_BUDGET, on_decision=None, seed=None):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.budget = budget  # None: finish every search at once (deterministic, for batch runs)
+        self.rng = random.Random(seed)
+        # Instrumentation hook: on_decision(seconds, mode) after every decide()
+        self.on_decision = on_decision
+        self.decision_times = deque(maxlen=1000)
+        self.max_decision_time = 0.0
+        self.modes = {}
+
+        # Both orientations of the cycle, so the route never starts with a U-turn
+        cycle = hamiltonian_cycle(grid_width, grid_height)
+        if cycle:
+            self.cycles = [
+                {cell: cycle[(i + 1) % len(cycle)] for i, cell in enumerate(cycle)},
+                {cell: cycle[i - 1] for i, cell in enumerate(cycle)},
+            ]
+        else:
+            self.cycles = []
+        self.lookahead = MIN_LOOKAHEAD
+
+        # BFS scratch, reused by every search (see _bfs)
+        cells = grid_width * grid_height
+        self._neighbours = [
+            tuple((y + dy) * grid_width + x + dx for dx, dy in DIRECTIONS.values()
+                  if 0 <= x + dx < grid_width and 0 <= y + dy < grid_height)
+            for y in range(grid_height) for x in range(grid_width)
+        ]
+        self._seen = [0] * cells     # stamp of the last BFS that reached the cell
+        self._parent = [0] * cells
+        self._depth = [0] * cells
+        self._queue = [0] * cells
+        self._stamp = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the plan and the tracked body (new game or restored snapshot)."""
+        self._entered = [0] * (self.grid_width * self.grid_height)  # flat cell -> move the head last entered it on
+        self._moves = 0          # moves seen; segment i was entered on move _moves - i
+        self._head = None
+        self._length = 0
+        self._drop_plan()
+
+    def _drop_plan(self, keep_escape=False):
+        self.plan = deque()      # cells to enter, route first, then the path to the food
+        self.plan_food = None
+        self.plan_complete = False
+        self.search = None
+        if not keep_escape:
+            self.escape = deque()  # verified way to the tail once the plan is done
+
+    # --- Per-tick decision ------------------------------------------------
+    def decide(self, engine):
+        """Direction for the next engine.step(). Never reverses into the neck."""
+        start = time.perf_counter()
+        self._track(engine)
+        food = engine.food
+
+        if self.plan_food != food:
+            # Eating as planned leaves the escape path valid for the next route
+            self._drop_plan(keep_escape=self.plan_complete and not self.plan)
+        elif self.plan and not engine.is_free(self.plan[0]):
+            self._drop_plan()
+        elif self.search is not None and not self.plan:
+            # Route ran out before the search finished: its result would be stale
+            self.search = None
+            self.lookahead = min(self.lookahead * 2, MAX_LOOKAHEAD)
+
+        if self.search is None and not self.plan_complete and not self.plan and food is not None:
+            self._start_search(engine, food)
+        if self.search is not None:
+            deadline = None if self.budget is None else start + self.budget
+            try:
+                while deadline is None or time.perf_counter() < deadline:
+                    next(self.search)
+            except StopIteration as done:
+                self.search = None
+                path, self.escape = done.value
+                if len(self.plan) > self.lookahead // 2:
+                    self.lookahead = max(MIN_LOOKAHEAD, self.lookahead // 2)
+                self.plan.extend(path)
+                self.plan_complete = bool(path)
+                if not self.plan and self.escape:
+                    # No safe food path and no route: take the escape's first step,
+                    # the next search starts from there on the next tick
+                    self.plan.append(self.escape.popleft())
+
+        if self.plan and not engine.is_free(self.plan[0]):
+            # A fresh route can start on a cell the body has not left yet
+            self._drop_plan()
+        if self.plan:
+            mode = "plan" if self.plan_complete else "route"
+            direction = _direction(engine.head, self.plan.popleft())
+        else:
+            mode, direction = self._fallback(engine)
+
+        elapsed = time.perf_counter() - start
+        self.decision_times.append(elapsed)
+        self.modes[mode] = self.modes.get(mode, 0) + 1
+        if elapsed > self.max_decision_time:
+            self.max_decision_time = elapsed
+        if self.on_decision is not None:
+            self.on_decision(elapsed, mode)
+        return direction
+
+    def stats(self):
+        times = sorted(self.decision_times)
+        if not times:
+            return {"decisions": 0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "modes": {}}
+        return {
+            "decisions": len(times),
+            "avg_ms": sum(times) / len(times) * 1000.0,
+            "p99_ms": percentile(times, 99) * 1000.0,
+            "max_ms": self.max_decision_time * 1000.0,
+            "modes": dict(self.modes),
+        }
+
+    def _track(self, engine):
+        """Record the engine's last move; anything but one step rebuilds the numbering."""
+        body = engine.body
+        head = body[0]
+        if head == self._head and len(body) == self._length:
+            return
+        w = self.grid_width
+        if (self._head is not None and len(body) > 1 and body[1] == self._head
+                and 0 <= len(body) - self._length <= 1):
+            self._moves += 1
+            self._entered[head[1] * w + head[0]] = self._moves
+        else:
+            # First decision of a game, or the board changed under us: O(cells), once
+            self._moves = len(body)
+            entered = self._entered = [0] * (w * self.grid_height)
+            for i, (x, y) in enumerate(body):
+                entered[y * w + x] = self._moves - i
+            self._drop_plan()
+        self._head = head
+        self._length = len(body)
+
+    # --- Route / fallback -------------------------------------------------
+    def _cycle_for(self, engine):
+        """The cycle orientation whose next cell is not a U-turn, or None."""
+        reverse = OPPOSITES[engine.direction]
+        for cycle_next in self.cycles:
+            if _direction(engine.head, cycle_next[engine.head]) != reverse:
+                return cycle_next
+        return None
+
+    def _fallback(self, engine):
+        """
+        No plan this tick: the free neighbour with the most room, preferring
+        the Hamiltonian cycle's next cell, then the one nearest the tail.
+        """
+        head = engine.head
+        reverse = OPPOSITES[engine.direction]
+        cycle_next = self._cycle_for(engine)
+        cycle_cell = cycle_next[head] if cycle_next is not None else None
+        tail = engine.body[-1]
+        limit = min(len(engine.body), ROOM_LIMIT)
+        best = None
+        for name, (dx, dy) in DIRECTIONS.items():
+            cell = (head[0] + dx, head[1] + dy)
+            if name != reverse and engine.is_free(cell):
+                room = self._room(cell[1] * self.grid_width + cell[0], limit, len(engine.body))
+                dist = abs(cell[0] - tail[0]) + abs(cell[1] - tail[1])
+                key = (room, cell == cycle_cell, -dist)
+                if best is None or key > best[0]:
+                    best = (key, name, "cycle" if cell == cycle_cell else "tail")
+        if best is not None:
+            return best[2], best[1]
+        return "stuck", engine.direction
+
+    def _room(self, start, limit, n):
+        """Free cells reachable from the flat cell start, counting up to limit (n: body length)."""
+        entered, neighbours = self._entered, self._neighbours
+        floor = self._moves - n  # cells entered after this move are body segments
+        seen = {start}
+        frontier = [start]
+        while frontier and len(seen) < limit:
+            for cell in neighbours[frontier.pop()]:
+                if cell not in seen and entered[cell] <= floor:
+                    seen.add(cell)
+                    frontier.append(cell)
+        return len(seen)
+
+    def _route(self, engine):
+        """Cells to follow while the search runs: the last escape path, else the cycle."""
+        if self.escape:
+            return list(islice(self.escape, self.lookahead))
+        cycle_next = self._cycle_for(engine)
+        route = []
+        if cycle_next is not None:
+            cell = engine.head
+            for _ in range(self.lookahead):
+                cell = cycle_next[cell]
+                route.append(cell)
+        return route
+
+    def _start_search(self, engine, food):
+        n = len(engine.body)
+        w = self.grid_width
+        candidates = self._route(engine)
+        route = []
+        for move, cell in enumerate(candidates, 1):
+            # Stop before a segment that is still there when the head arrives (the
+            # one entered on move e leaves after move e + n), and before the food:
+            # eating it is only safe once the search agrees
+            if cell == food or (cell in engine.occupied
+                                and self._entered[cell[1] * w + cell[0]] + n - self._moves >= move):
+                break
+            route.append(cell)
+        # The rest of the escape path stays valid if the route followed it unchanged
+        if self.escape and len(route) == len(candidates):
+            for _ in route:
+                self.escape.popleft()
+        else:
+            self.escape = deque()
+        self.plan = deque(route)
+        self.plan_food = food
+        self.search = self._search(engine, route, food, n, self._moves)
+
+    # --- Sliced search ----------------------------------------------------
+    def _bfs(self, start, goal, planned, offset, static=False):
+        """
+        Time-aware BFS generator over flat cells. A cell entered on move e
+        (planned[cell], else the tracked move) is still occupied when the head
+        would enter it on move d (1-based) while e + offset >= d. static=True
+        keeps every segment but the tail blocked for good. Yields every SLICE
+        expansions; returns the path (cells after start, ending at goal) or None.
+        """
+        w = self.grid_width
+        entered, neighbours = self._entered, self._neighbours
+        seen, parent, depth, queue = self._seen, self._parent, self._depth, self._queue
+        self._stamp += 1
+        stamp = self._stamp
+        start = start[1] * w + start[0]
+        goal = goal[1] * w + goal[0]
+        seen[start] = stamp
+        depth[start] = 0
+        queue[0] = start
+        head, tail = 0, 1
+        expanded = 0
+        while head < tail:
+            cell = queue[head]
+            head += 1
+            dist = depth[cell]
+            # Cells entered after move `floor` are still there on move dist + 1
+            floor = (min(dist, 1) if static else dist) - offset
+            if cell == goal:
+                path = []
+                while cell != start:
+                    path.append((cell % w, cell // w))
+                    cell = parent[cell]
+                    if len(path) % COPY_SLICE == 0:
+                        yield
+                path.reverse()
+                return path
+            for nxt in neighbours[cell]:
+                if seen[nxt] == stamp or (planned.get(nxt) or entered[nxt]) > floor:
+                    continue
+                seen[nxt] = stamp
+                parent[nxt] = cell
+                depth[nxt] = dist + 1
+                queue[tail] = nxt
+                tail += 1
+            expanded += 1
+            if expanded % SLICE == 0:
+                yield
+        return None
+
+    def _search(self, engine, route, food, n, moves):
+        """
+        Returns (path to the food, escape route afterwards). With no safe food
+        path the first is empty and the escape route starts right away.
+        n and moves are the length and move count when the route was taken.
+        """
+        # Board state once the route has been followed (no food on the route),
+        # as flat cell -> planned move
+        w = self.grid_width
+        now = moves + len(route)
+        planned = {y * w + x: moves + i for i, (x, y) in enumerate(route, 1)}
+        head = route[-1] if route else engine.head
+        path = yield from self._bfs(head, food, planned, n - now)
+        if path:
+            # Safety: after eating, the new head must still reach the tail
+            after = dict(planned)
+            for i, (x, y) in enumerate(path, 1):
+                after[y * w + x] = now + i
+                if i % COPY_SLICE == 0:
+                    yield
+            yield
+            escape = yield from self._escape(engine, after, route + path, now + len(path), n + 1)
+            if escape:
+                return path, escape
+
+        # No safe way to the food yet: buy time by chasing the tail. The first
+        # step is a random safe one so the body shape changes instead of
+        # repeating the same loop forever around an unreachable food.
+        steps = [(head[0] + dx, head[1] + dy) for dx, dy in DIRECTIONS.values()]
+        self.rng.shuffle(steps)
+        for cell in steps:
+            if not (0 <= cell[0] < self.grid_width and 0 <= cell[1] < self.grid_height):
+                continue
+            flat = cell[1] * w + cell[0]
+            if (planned.get(flat) or self._entered[flat]) + n - now > 0 or cell == food:
+                continue
+            after = dict(planned)
+            after[flat] = now + 1
+            escape = yield from self._escape(engine, after, route + [cell], now + 1, n)
+            if escape:
+                escape.appendleft(cell)
+                return [], escape
+        return [], deque()
+
+    def _escape(self, engine, planned, recent, now, length):
+        """
+        A way to the tail of the planned board (move `now`, `length` segments,
+        `recent` the cells entered after the current move) through cells that
+        are free right now, followed by the body itself: the head then retraces
+        the cells the tail vacates, so the whole route stays safe however long
+        it is. Kept to ESCAPE_LIMIT cells; empty if there is none.
+        """
+        tail_move = now - length + 1
+        tail, = self._entered_on(engine, recent, now, tail_move, tail_move)
+        path = yield from self._bfs(recent[-1], tail, planned, length - now, static=True)
+        if not path:
+            return deque()
+        yield
+        escape = deque(path[:ESCAPE_LIMIT])
+        last = min(now - 1, tail_move + ESCAPE_LIMIT - len(escape))
+        escape.extend(self._entered_on(engine, recent, now, tail_move + 1, last))
+        return escape
+
+    def _entered_on(self, engine, recent, now, first, last):
+        """Cells of the planned board entered on moves first..last, oldest first."""
+        if first > last:
+            return []
+        split = now - len(recent)  # recent[0] is entered on move split + 1
+        cells = []
+        if first <= split:
+            # Older moves are still on the body: move e is body[_moves - e]
+            skip = len(engine.body) - 1 - (self._moves - first)
+            cells = list(islice(reversed(engine.body), skip, skip + min(last, split) - first + 1))
+        if last > split:
+            cells += recent[max(first, split + 1) - split - 1:last - split]
+        return cells
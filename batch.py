@@ -0,0 +1,386 @@
+# batch.py
+"""
+Headless batch runner: plays many games across a process pool and
+aggregates score / game-length distributions and throughput.
+
+    python batch.py --games 100000 --policy autopilot --grid 20x15
+    python batch.py --games 1000000 --policy greedy --jsonl games.jsonl -o summary.json
+    python batch.py --policy mybots:Hunter          # any module:callable
+
+Games follow SnakeGame's rules and RNG stream (same start, same food
+placement per seed, no reversing into the neck), so a (policy, grid, seed)
+triple always replays the same game. A policy is a factory
+`policy(grid_width, grid_height, seed)` returning an object whose
+`decide(engine)` gives the direction for the next tick.
+
+Workers import only the engine and the policy (no pygame) and get games in
+chunks, so IPC stays negligible and throughput scales with the core count.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from autopilot import Autopilot, hamiltonian_cycle
+from engine import DIRECTIONS, FOODS, OPPOSITES, SnakeEngine, STEP_ATE, STEP_DEAD, start_body
+
+CHUNK_GAMES = 64    # games per task sent to a worker
+STALL_FACTOR = 4    # a game without food for STALL_FACTOR * cells ticks is stopped
+PROGRESS_INTERVAL = 2.0
+
+OUTCOME_DEAD = "dead"
+OUTCOME_WON = "won"
+OUTCOME_STALLED = "stalled"
+OUTCOME_TIMEOUT = "timeout"
+
+
+# --- Built-in policies -------------------------------------------------
+def _safe_moves(engine):
+    head = engine.head
+    reverse = OPPOSITES[engine.direction]
+    return [name for name, (dx, dy) in DIRECTIONS.items()
+            if name != reverse and engine.is_free((head[0] + dx, head[1] + dy))]
+
+
+class RandomPolicy:
+    """Any move that does not die this tick."""
+
+    def __init__(self, grid_width, grid_height, seed=None):
+        self.rng = random.Random(seed)
+
+    def decide(self, engine):
+        moves = _safe_moves(engine)
+        return self.rng.choice(moves) if moves else engine.direction
+
+
+class GreedyPolicy:
+    """The non-fatal move that gets closest to the food."""
+
+    def __init__(self, grid_width, grid_height, seed=None):
+        pass
+
+    def decide(self, engine):
+        moves = _safe_moves(engine)
+        if not moves or engine.food is None:
+            return moves[0] if moves else engine.direction
+        head, food = engine.head, engine.food
+
+        def distance(name):
+            dx, dy = DIRECTIONS[name]
+            return abs(head[0] + dx - food[0]) + abs(head[1] + dy - food[1])
+        return min(moves, key=distance)
+
+
+class CyclePolicy:
+    """Walks a Hamiltonian cycle: never dies, fills the board slowly."""
+
+    def __init__(self, grid_width, grid_height, seed=None):
+        cycle = hamiltonian_cycle(grid_width, grid_height)
+        if cycle is None:
+            raise ValueError("the cycle policy needs an even grid width or height")
+        # Both orientations: the start position fits one of them without a U-turn
+        self.orientations = [
+            {cell: cycle[(i + 1) % len(cycle)] for i, cell in enumerate(cycle)},
+            {cell: cycle[i - 1] for i, cell in enumerate(cycle)},
+        ]
+
+    def decide(self, engine):
+        head = engine.head
+        for cycle_next in self.orientations:
+            nx, ny = cycle_next[head]
+            if engine.is_free((nx, ny)):
+                for name, (dx, dy) in DIRECTIONS.items():
+                    if (head[0] + dx, head[1] + dy) == (nx, ny):
+                        return name
+        return engine.direction
+
+
+def _autopilot(grid_width, grid_height, seed=None):
+    # No time budget: every search finishes in its tick, so runs are reproducible
+    return Autopilot(grid_width, grid_height, budget=None, seed=seed)
+
+
+POLICIES = {
+    "autopilot": _autopilot,
+    "cycle": CyclePolicy,
+    "greedy": GreedyPolicy,
+    "random": RandomPolicy,
+}
+
+
+def resolve_policy(spec):
+    """A built-in policy name or "module:callable"."""
+    if spec in POLICIES:
+        return POLICIES[spec]
+    module_name, sep, attr = spec.partition(":")
+    if not sep:
+        raise ValueError(f"unknown policy {spec!r} (built-in: {', '.join(sorted(POLICIES))})")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# --- One game ----------------------------------------------------------
+def play_game(policy_factory, grid_width, grid_height, seed, stall_ticks=None, max_ticks=None):
+    """
+    Play one game with SnakeGame's rules and RNG stream.
+    Returns (seed, score, ticks, outcome, cpu_seconds).
+    """
+    start = time.process_time()
+    rng = random.Random(seed)
+    engine = SnakeEngine(grid_width, grid_height)
+    engine.reset(start_body(grid_height), "RIGHT")
+    # SnakeGame.create_food(): free cell, then the emoji, from the same RNG
+    if engine.spawn_food(rng) is not None:
+        rng.choice(FOODS)
+    policy = policy_factory(grid_width, grid_height, seed)
+    if stall_ticks is None:
+        stall_ticks = STALL_FACTOR * grid_width * grid_height
+
+    score = 0
+    tick = 0
+    last_food = 0
+    outcome = OUTCOME_TIMEOUT
+    while max_ticks is None or tick < max_ticks:
+        direction = policy.decide(engine)
+        # SnakeGame.change_direction(): reversing into the neck is ignored
+        if direction in OPPOSITES and direction != OPPOSITES[engine.direction]:
+            engine.direction = direction
+        result = engine.step()
+        tick += 1
+        if result == STEP_DEAD:
+            outcome = OUTCOME_DEAD
+            break
+        if result == STEP_ATE:
+            score += 1
+            last_food = tick
+            if engine.spawn_food(rng) is None:
+                outcome = OUTCOME_WON
+                break
+            rng.choice(FOODS)
+        elif tick - last_food >= stall_ticks:
+            outcome = OUTCOME_STALLED
+            break
+    return seed, score, tick, outcome, time.process_time() - start
+
+
+_factories = {}  # policy spec -> factory, resolved once per worker process
+
+def run_chunk(policy_spec, grid_width, grid_height, seeds, stall_ticks, max_ticks):
+    factory = _factories.get(policy_spec)
+    if factory is None:
+        factory = _factories[policy_spec] = resolve_policy(policy_spec)
+    return [play_game(factory, grid_width, grid_height, seed, stall_ticks, max_ticks)
+            for seed in seeds]
+
+
+# --- Aggregation -------------------------------------------------------
+def _percentile(counter, total, fraction):
+    """Value at the given fraction of a {value: count} distribution."""
+    target = fraction * (total - 1)
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen > target:
+            return value
+    return 0
+
+
+class Summary:
+    """Running totals; add() is O(1) so millions of games stay cheap."""
+
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.cpu_seconds = 0.0
+        self.scores = Counter()
+        self.lengths = Counter()  # game length in ticks
+        self.outcomes = Counter()
+
+    def add(self, result):
+        _, score, ticks, outcome, cpu_seconds = result
+        self.games += 1
+        self.ticks += ticks
+        self.cpu_seconds += cpu_seconds
+        self.scores[score] += 1
+        self.lengths[ticks] += 1
+        self.outcomes[outcome] += 1
+
+    def distribution(self, counter):
+        if not self.games:
+            return {}
+        return {
+            "mean": sum(v * n for v, n in counter.items()) / self.games,
+            "min": min(counter),
+            "p50": _percentile(counter, self.games, 0.50),
+            "p90": _percentile(counter, self.games, 0.90),
+            "p99": _percentile(counter, self.games, 0.99),
+            "max": max(counter),
+        }
+
+    @staticmethod
+    def histogram(counter, buckets=20):
+        """[(low, high, count)] over equal-width buckets."""
+        if not counter:
+            return []
+        low, high = min(counter), max(counter)
+        width = max(1, -(-(high - low + 1) // buckets))
+        counts = Counter()
+        for value, n in counter.items():
+            counts[(value - low) // width] += n
+        return [(low + i * width, low + (i + 1) * width - 1, counts[i])
+                for i in range((high - low) // width + 1)]
+
+    def report(self, wall_seconds, workers):
+        return {
+            "games": self.games,
+            "ticks": self.ticks,
+            "outcomes": dict(self.outcomes),
+            "score": self.distribution(self.scores),
+            "game_length": self.distribution(self.lengths),
+            "score_histogram": self.histogram(self.scores),
+            "length_histogram": self.histogram(self.lengths),
+            "throughput": {
+                "wall_seconds": wall_seconds,
+                "workers": workers,
+                "games_per_sec": self.games / wall_seconds if wall_seconds else 0.0,
+                "ticks_per_sec": self.ticks / wall_seconds if wall_seconds else 0.0,
+                # Measured on each worker's CPU clock, so it is independent of scaling
+                "games_per_sec_per_core": self.games / self.cpu_seconds if self.cpu_seconds else 0.0,
+                "ticks_per_sec_per_core": self.ticks / self.cpu_seconds if self.cpu_seconds else 0.0,
+                # 1.0 = every worker busy for the whole run
+                "scaling_efficiency": (self.cpu_seconds / (wall_seconds * workers)
+                                       if wall_seconds and workers else 0.0),
+            },
+        }
+
+
+def format_report(report, file=sys.stderr):
+    t = report["throughput"]
+    print(f"{report['games']:,} games, {report['ticks']:,} ticks in {t['wall_seconds']:.1f} s "
+          f"on {t['workers']} workers ({t['scaling_efficiency'] * 100:.0f}% busy)", file=file)
+    print(f"  {t['games_per_sec']:,.0f} games/s, {t['ticks_per_sec']:,.0f} ticks/s "
+          f"({t['games_per_sec_per_core']:,.0f} games/s, {t['ticks_per_sec_per_core']:,.0f} ticks/s per core)",
+          file=file)
+    print(f"  outcomes: {', '.join(f'{k} {v:,}' for k, v in sorted(report['outcomes'].items()))}", file=file)
+    for title, dist, hist in (("score", report["score"], report["score_histogram"]),
+                              ("game length (ticks)", report["game_length"], report["length_histogram"])):
+        if not dist:
+            continue
+        print(f"  {title}: mean {dist['mean']:.1f}  p50 {dist['p50']}  p90 {dist['p90']}  "
+              f"p99 {dist['p99']}  max {dist['max']}", file=file)
+        peak = max(n for _, _, n in hist) or 1
+        for low, high, n in hist:
+            print(f"    {low:>8}-{high:<8} {n:>10,} {'#' * round(40 * n / peak)}", file=file)
+
+
+# --- Runner ------------------------------------------------------------
+def run_batch(policy_spec, grid_width, grid_height, games, seed=0, workers=None,
+              chunk=CHUNK_GAMES, stall_ticks=None, max_ticks=None, on_result=None,
+              progress=False):
+    """
+    Play games with seeds seed, seed+1, ... and return the aggregated
+    Summary and wall time. on_result(result) is called as games finish.
+    """
+    resolve_policy(policy_spec)  # fail here, not in every worker
+    workers = workers or os.cpu_count() or 1
+    summary = Summary()
+    start = time.perf_counter()
+    next_progress = start + PROGRESS_INTERVAL
+    chunks = ((seed + i, min(chunk, games - i)) for i in range(0, games, chunk))
+
+    def collect(results):
+        for result in results:
+            summary.add(result)
+            if on_result is not None:
+                on_result(result)
+
+    if workers == 1:
+        for first, count in chunks:
+            collect(run_chunk(policy_spec, grid_width, grid_height,
+                              range(first, first + count), stall_ticks, max_ticks))
+        return summary, time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+
+        def submit_more():
+            # A few chunks queued per worker keeps them busy without
+            # holding millions of futures in memory
+            for first, count in chunks:
+                pending.add(pool.submit(run_chunk, policy_spec, grid_width, grid_height,
+                                        range(first, first + count), stall_ticks, max_ticks))
+                if len(pending) >= workers * 4:
+                    break
+
+        submit_more()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending -= done
+            for future in done:
+                collect(future.result())
+            submit_more()
+            if progress and time.perf_counter() >= next_progress:
+                next_progress += PROGRESS_INTERVAL
+                elapsed = time.perf_counter() - start
+                print(f"  {summary.games:,}/{games:,} games, {summary.games / elapsed:,.0f} games/s",
+                      file=sys.stderr)
+    return summary, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless Snake games in parallel")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", default="autopilot",
+                        help=f"{', '.join(sorted(POLICIES))} or module:callable")
+    parser.add_argument("--grid", default="20x15", help="WIDTHxHEIGHT in cells (default 20x15)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed+i")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_GAMES, help="games per task")
+    parser.add_argument("--stall-ticks", type=int, default=None,
+                        help=f"stop a game after this many ticks without food (default {STALL_FACTOR} x cells)")
+    parser.add_argument("--max-ticks", type=int, default=None, help="hard limit on game length")
+    parser.add_argument("--jsonl", help="stream one JSON line per finished game to this file")
+    parser.add_argument("-o", "--output", help="write the JSON summary to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        grid_width, grid_height = (int(v) for v in args.grid.lower().split("x"))
+    except ValueError:
+        parser.error(f"bad --grid {args.grid!r}, expected e.g. 20x15")
+
+    try:
+        resolve_policy(args.policy)
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(f"bad --policy: {e}")
+
+    stream = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+
+    def on_result(result):
+        seed, score, ticks, outcome, cpu_seconds = result
+        stream.write(json.dumps({"seed": seed, "score": score, "ticks": ticks,
+                                 "outcome": outcome, "cpu_seconds": round(cpu_seconds, 6)}) + "\n")
+
+    try:
+        summary, wall = run_batch(args.policy, grid_width, grid_height, args.games, args.seed,
+                                  args.workers, args.chunk, args.stall_ticks, args.max_ticks,
+                                  on_result if stream else None, progress=True)
+    finally:
+        if stream:
+            stream.close()
+
+    report = summary.report(wall, args.workers or os.cpu_count() or 1)
+    report["meta"] = {"policy": args.policy, "grid": [grid_width, grid_height], "seed": args.seed,
+                      "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    format_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
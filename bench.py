@@ -0,0 +1,432 @@
+# bench.py
+"""
+Headless benchmarks for the engine and renderer.
+
+Runs under SDL's dummy video driver and prints machine-readable JSON:
+
+    python bench.py                          # full sweep, JSON to stdout
+    python bench.py --quick -o base.json     # small sweep, save as baseline
+    python bench.py --compare base.json      # exit 1 on regressions
+
+Every result is a rate (higher is better) in the unit it names; some carry
+extra fields, listed below.
+
+Per grid, from 20x15 up to 4K fullscreen (3840x2160 at GRID_SIZE 32), with
+snake lengths from 3 up to a nearly full board: ticks/s for move() and
+create_food(), frames/s for the draw paths (game, dirty, legendary, pause,
+menu), snapshots/s for saving, packing and loading a game in progress (with
+ms and the snapshot size), and decisions/s for the autopilot (with its
+p99/max decision time).
+
+Snake drawing: frames/s for the snake alone with 100 to 10,000 segments,
+batched sprites against the old per-segment rects.
+
+Start-to-first-frame: starts/s (with ms) for the first Start of a fresh
+process against a warm restart of the menu's reused game.
+
+Big-board mode, on a 1000x1000 board through a 1920x1080 window, with
+snake lengths from 3 to 500,000: frames/s while the camera scrolls, and
+snapshot save/pack/load as above.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # keep stdout pure JSON
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import pygame
+
+import game
+from autopilot import Autopilot, hamiltonian_cycle
+from engine import DIRECTIONS, SnakeEngine, STEP_ATE, STEP_DEAD, start_body
+from persistence import STORE
+from replay import ReplayRecorder
+from snapshot import Snapshot
+
+# (grid_width, grid_height); screen = grid * GRID_SIZE + 60px score bar
+GRIDS = [(20, 15), (60, 31), (120, 65)]
+QUICK_GRIDS = [(20, 15), (60, 31)]
+FILL_LEVELS = [0.25, 0.5, 0.95]  # fractions of the board, plus length 3
+BIG_BOARD = (1000, 1000)         # big-board mode, seen through a 1920x1080 window
+BIG_VIEW = (1920, 1080)
+BIG_LENGTHS = [3, 10000, 500000]
+SNAKE_GRID = (128, 80)           # room for the longest snake below
+SNAKE_LENGTHS = [100, 1000, 10000]
+START_VIEW = (1920, 1080)        # window for the Start-to-first-frame benchmark
+COLD_START_RUNS = 3              # fresh processes per cold start measurement (at least)
+
+
+# --- Setup helpers -----------------------------------------------------
+def make_game(grid_w, grid_h, length, skin_idx=0, legendary=False):
+    """A SnakeGame whose snake of the given length lies on a Hamiltonian cycle."""
+    screen = pygame.display.set_mode((grid_w * game.GRID_SIZE, grid_h * game.GRID_SIZE + 60))
+    # Own session: the highscore below must not leak into other games
+    session = game.GameSession(screen, start_music=False)
+    g = game.SnakeGame(screen, skin_idx=skin_idx, legendary_unlocked=legendary, session=session)
+    g.start_game()
+    # Keep disk writes out of the tick benchmark
+    g.highscore = 10 ** 9
+    cycle = hamiltonian_cycle(g.grid_width, g.grid_height)
+    g.bench_cycle = cycle
+    g.bench_next = {cell: cycle[(i + 1) % len(cycle)] for i, cell in enumerate(cycle)}.__getitem__
+    place_snake(g, length)
+    return g
+
+
+class SerpentineCycle:
+    """hamiltonian_cycle() for an even height, computed per cell instead of stored."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def __getitem__(self, i):
+        w, h = self.width, self.height
+        if i < (w - 1) * h:
+            y, k = divmod(i, w - 1)
+            return (1 + k if y % 2 == 0 else w - 1 - k, y)
+        return (0, h - 1 - (i - (w - 1) * h))
+
+    def next(self, cell):
+        x, y = cell
+        w, h = self.width, self.height
+        if x == 0:
+            return (0, y - 1) if y > 0 else (1, 0)
+        if y % 2 == 0:
+            return (x + 1, y) if x < w - 1 else (x, y + 1)
+        if x > 1:
+            return (x - 1, y)
+        return (1, y + 1) if y < h - 1 else (0, y)
+
+
+def make_big_game(board, view, length):
+    """A big-board SnakeGame with a snake of the given length on a serpentine cycle."""
+    screen = pygame.display.set_mode(view)
+    g = game.SnakeGame(screen, board_size=board, session=game.GameSession(screen, start_music=False))
+    g.start_game()
+    g.highscore = 10 ** 9
+    cycle = SerpentineCycle(*board)
+    g.bench_cycle = cycle
+    g.bench_next = cycle.next
+    place_snake(g, length)
+    g.viewport.invalidate()
+    return g
+
+
+def place_snake(g, length):
+    cycle = g.bench_cycle
+    body = [cycle[i] for i in range(length - 1, -1, -1)]
+    g.engine.reset(body, "RIGHT")
+    g.state = "game"
+    g.food = g.create_food()
+    g.needs_full_redraw = True
+
+
+def follow_cycle(g):
+    hx, hy = g.snake[0]
+    nx, ny = g.bench_next((hx, hy))
+    for name, (dx, dy) in DIRECTIONS.items():
+        if (hx + dx, hy + dy) == (nx, ny):
+            g.direction = name
+            return
+
+
+def rate(fn, min_time):
+    """Calls per second of fn(), measured over at least min_time seconds."""
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            fn()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+        batch = min(batch * 2, 4096)
+
+
+# --- Benchmarks --------------------------------------------------------
+def bench_move(g, length, min_time):
+    def tick():
+        follow_cycle(g)
+        g.move()
+        if g.state != "game":
+            place_snake(g, length)
+    return rate(tick, min_time)
+
+
+def bench_create_food(g, min_time):
+    return rate(g.create_food, min_time)
+
+
+def bench_draw(g, min_time):
+    return rate(g.draw, min_time)
+
+
+def bench_draw_dirty(g, length, min_time):
+    g.draw()
+
+    def frame():
+        follow_cycle(g)
+        g.move()
+        if g.state != "game":
+            place_snake(g, length)
+            g.draw()
+        else:
+            pygame.display.update(g.draw_dirty())
+    return rate(frame, min_time)
+
+
+def bench_snapshot(g, min_time):
+    """
+    Autosave and Continue: taking a snapshot (game thread), packing it
+    (persistence thread, see SnakeGame.save_snapshot), and parsing +
+    restoring one.
+    """
+    # Fresh recording: earlier benchmarks ended the game or left a huge replay
+    g.recorder = ReplayRecorder(g.grid_width, g.grid_height, g.seed, g.direction)
+    snapshot = g.take_snapshot()
+    data = snapshot.to_bytes()
+    results = []
+    for fn in (g.take_snapshot, snapshot.to_bytes, lambda: g.restore_snapshot(Snapshot.from_bytes(data))):
+        value = rate(fn, min_time)
+        results.append({"value": value, "unit": "snapshots/s", "ms": 1000.0 / value, "bytes": len(data)})
+    return results
+
+
+def bench_big_snapshot(min_time):
+    """Snapshots on the 1000x1000 big board, whose free list is never stored."""
+    results = {}
+    w, h = BIG_BOARD
+    for length in BIG_LENGTHS:
+        g = make_big_game(BIG_BOARD, BIG_VIEW, length)
+        tag = f"{w}x{h},len={length}"
+        for name, res in zip(("save", "pack", "load"), bench_snapshot(g, min_time)):
+            results[f"snapshot_{name}[{tag}]"] = res
+    return results
+
+
+def draw_snake_rects(g):
+    """The pre-sprite snake path: one rounded rect per segment (for comparison)."""
+    skin = game.SKINS[g.skin_idx]
+    size = game.GRID_SIZE
+    for i, (x, y) in enumerate(g.snake):
+        color = skin["head"] if i == 0 else skin["body"]
+        pygame.draw.rect(g.screen, color, (x*size, y*size+60, size, size), border_radius=8)
+
+
+def bench_draw_snake(min_time):
+    """Snake-only drawing: batched sprites (draw_snake) against per-segment rects."""
+    results = {}
+    w, h = SNAKE_GRID
+    for length in SNAKE_LENGTHS:
+        g = make_game(w, h, length)
+        tag = f"{w}x{h},len={length}"
+        results[f"draw_snake[{tag}]"] = {"value": rate(g.draw_snake, min_time), "unit": "frames/s"}
+        results[f"draw_snake_rects[{tag}]"] = {"value": rate(lambda: draw_snake_rects(g), min_time),
+                                               "unit": "frames/s"}
+    return results
+
+
+def cold_start():
+    """Seconds for the first Start in this process; bench_start runs it in a fresh interpreter."""
+    pygame.init()
+    screen = pygame.display.set_mode(START_VIEW)
+    start = time.perf_counter()
+    g = game.SnakeGame(screen, session=game.GameSession(screen))
+    g.start_game()
+    g.draw()
+    pygame.display.flip()
+    return time.perf_counter() - start
+
+
+def bench_start(min_time):
+    """
+    Start-to-first-frame: everything between clicking Start and the first
+    presented game frame. "cold" is the first Start of a fresh process (the
+    median over COLD_START_RUNS or more interpreters): fonts, food atlas and
+    score store are built from scratch, only the font cache file is on disk.
+    "warm" restarts the menu's reused game.
+    """
+    screen = pygame.display.set_mode(START_VIEW)
+    g = game.SnakeGame(screen, session=game.GameSession(screen))
+    STORE.flush()  # font_cache.json on disk, as a previous run would have left it
+
+    code = (f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+            "import bench; print(bench.cold_start())")
+    times = []
+    start = time.perf_counter()
+    while len(times) < COLD_START_RUNS or time.perf_counter() - start < min_time:
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]))
+    cold = sorted(times)[len(times) // 2]
+
+    def warm():
+        g.start_game()
+        g.draw()
+        pygame.display.flip()
+
+    warm_rate = rate(warm, min_time)
+    return {
+        "start_to_first_frame[cold]": {"value": 1.0 / cold, "unit": "starts/s", "ms": cold * 1000.0},
+        "start_to_first_frame[warm]": {"value": warm_rate, "unit": "starts/s", "ms": 1000.0 / warm_rate},
+    }
+
+
+def bench_big_board(min_time):
+    """
+    Frames/s of big-board mode, moving one tick per frame so the camera
+    scrolls. Should stay flat as the snake grows.
+    """
+    results = {}
+    w, h = BIG_BOARD
+    for length in BIG_LENGTHS:
+        g = make_big_game(BIG_BOARD, BIG_VIEW, length)
+
+        def frame():
+            follow_cycle(g)
+            g.move()
+            if g.state != "game":
+                place_snake(g, length)
+                g.viewport.invalidate()
+            g.draw()
+        results[f"draw_big_board[{w}x{h},len={length}]"] = {"value": rate(frame, min_time), "unit": "frames/s"}
+    return results
+
+
+def bench_autopilot(grid_w, grid_h, min_time):
+    """Autopilot decisions per second over real games, plus the decision-time tail."""
+    engine = SnakeEngine(grid_w, grid_h)
+    pilot = Autopilot(grid_w, grid_h, seed=1)
+    food_rng = random.Random(1)
+
+    def new_game():
+        engine.reset(start_body(grid_h))
+        engine.spawn_food(food_rng)
+        pilot.reset()
+
+    def tick():
+        result = engine.step(pilot.decide(engine))
+        if result == STEP_DEAD or (result == STEP_ATE and engine.spawn_food(food_rng) is None):
+            new_game()
+
+    new_game()
+    value = rate(tick, min_time)
+    stats = pilot.stats()
+    return {"value": value, "unit": "decisions/s",
+            "p99_ms": stats["p99_ms"], "max_ms": stats["max_ms"]}
+
+
+def run_suite(grids, min_time):
+    results = {}
+    for grid_w, grid_h in grids:
+        cells = grid_w * grid_h
+        lengths = sorted({3} | {max(3, int(cells * f)) for f in FILL_LEVELS})
+        for length in lengths:
+            tag = f"{grid_w}x{grid_h},len={length}"
+            g = make_game(grid_w, grid_h, length)
+            results[f"move[{tag}]"] = {"value": bench_move(g, length, min_time), "unit": "ticks/s"}
+            place_snake(g, length)
+            results[f"create_food[{tag}]"] = {"value": bench_create_food(g, min_time), "unit": "ticks/s"}
+            place_snake(g, length)
+            results[f"draw[{tag}]"] = {"value": bench_draw(g, min_time), "unit": "frames/s"}
+            place_snake(g, length)
+            results[f"draw_dirty[{tag}]"] = {"value": bench_draw_dirty(g, length, min_time), "unit": "frames/s"}
+
+            lg = make_game(grid_w, grid_h, length, skin_idx=4, legendary=True)
+            results[f"draw_legendary[{tag}]"] = {"value": bench_draw(lg, min_time), "unit": "frames/s"}
+
+            place_snake(g, length)
+            g.state = "pause"
+            results[f"draw_pause[{tag}]"] = {"value": rate(g.draw_pause, min_time), "unit": "frames/s"}
+
+            place_snake(g, length)
+            for name, res in zip(("save", "pack", "load"), bench_snapshot(g, min_time)):
+                results[f"snapshot_{name}[{tag}]"] = res
+
+        results[f"autopilot[{grid_w}x{grid_h}]"] = bench_autopilot(grid_w, grid_h, min_time)
+
+        g = make_game(grid_w, grid_h, 3)
+        g.state = "menu"
+        results[f"draw_menu[{grid_w}x{grid_h}]"] = {"value": rate(g.draw_menu, min_time), "unit": "frames/s"}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print per-benchmark ratios against a baseline; return the regressed names."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base["value"]:
+            continue
+        ratio = res["value"] / base["value"]
+        flag = ""
+        if ratio < 1.0 - tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:45s} {base['value']:14.1f} -> {res['value']:14.1f} {res['unit']:9s} x{ratio:5.2f}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Snake benchmarks")
+    parser.add_argument("--quick", action="store_true", help="skip the 4K grid")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds per measurement")
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown before --compare reports a regression (default 10%%)")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    cwd = os.getcwd()
+    # Benchmarks must never touch the real highscore / achievement files
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            results = run_suite(QUICK_GRIDS if args.quick else GRIDS, args.min_time)
+            results.update(bench_draw_snake(args.min_time))
+            results.update(bench_start(args.min_time))
+            results.update(bench_big_board(args.min_time))
+            results.update(bench_big_snapshot(args.min_time))
+        finally:
+            os.chdir(cwd)
+    pygame.quit()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_time": args.min_time,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# capture.py
+"""
+Gameplay capture for SnakeGame.run(). F6 toggles it; game.py --capture=png
+or --capture=raw starts with it on.
+
+Each presented frame is copied into one of RING_SIZE preallocated buffers.
+That is a single memcpy from the display surface's pixel buffer, and the
+only work done on the game thread. Encoder threads then write the frames
+out, either as a PNG sequence (zlib, one file per frame) or as one raw
+video stream. If every buffer is still waiting for an encoder, the frame
+is dropped and counted so the game never stalls. Encoders work in bands
+of rows so they never hold the GIL for long.
+
+The raw stream holds the display's own 32-bit pixels. capture.json gives
+the ffmpeg pixel format and every frame's timestamp:
+
+    ffmpeg -f rawvideo -pixel_format bgr0 -video_size 1920x1080 -framerate 60 \\
+           -i video.raw highlight.mp4
+
+No pygame import needed for encoding; FrameCapture only reads the surface
+through get_buffer().
+"""
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+
+from profiler import percentile
+
+CAPTURE_DIR = "captures"
+RING_SIZE = 8           # frame buffers; a frame is dropped when all are busy
+PNG_WORKERS = 2
+PNG_LEVEL = 1           # zlib level: fast beats small for live capture
+BAND_ROWS = 32          # rows converted / compressed per step (keeps GIL holds short)
+FORMATS = ("png", "raw")
+
+
+def _byte_order(masks):
+    """Byte offsets of R, G, B in a 32-bit pixel, and the ffmpeg pixel format name."""
+    offsets = []
+    for mask in masks[:3]:
+        shift = (mask & -mask).bit_length() - 1
+        offsets.append(shift // 8 if sys.byteorder == "little" else 3 - shift // 8)
+    names = ["0"] * 4
+    for channel, offset in zip("rgb", offsets):
+        names[offset] = channel
+    return offsets, "".join(names)
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+class FrameCapture:
+    def __init__(self, size, pitch, masks, fmt="png", out_dir=None, workers=None, ring=RING_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown capture format {fmt!r} (use {' or '.join(FORMATS)})")
+        self.width, self.height = size
+        self.pitch = pitch
+        self.format = fmt
+        self.offsets, self.pixel_format = _byte_order(masks)
+        self.out_dir = out_dir or os.path.join(CAPTURE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        self.buffers = [bytearray(pitch * self.height) for _ in range(ring)]
+        self._views = [memoryview(b) for b in self.buffers]
+        self._free = queue.SimpleQueue()
+        for index in range(ring):
+            self._free.put(index)
+        self._jobs = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.captured = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+        self.overhead = deque(maxlen=1000)   # game-thread seconds per capture() call
+        self.timestamps = []                 # (frame, seconds since start)
+        self.started = time.perf_counter()
+        self._closer = None
+
+        # The raw stream must stay in order: one writer. PNG files are independent.
+        self._raw = open(os.path.join(self.out_dir, "video.raw"), "wb") if fmt == "raw" else None
+        count = 1 if fmt == "raw" else (workers or PNG_WORKERS)
+        self._workers = [threading.Thread(target=self._work, name=f"capture-{i}", daemon=True)
+                         for i in range(count)]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def for_surface(cls, surface, fmt="png", out_dir=None, workers=None):
+        if surface.get_bytesize() != 4:
+            raise ValueError("capture needs a 32-bit display surface")
+        return cls(surface.get_size(), surface.get_pitch(), surface.get_masks(), fmt, out_dir, workers)
+
+    # --- Game thread ------------------------------------------------------
+    def capture(self, surface):
+        """Queue the frame on screen; drops it if every buffer is busy. Returns True if kept."""
+        start = time.perf_counter()
+        try:
+            index = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            self.overhead.append(time.perf_counter() - start)
+            return False
+        self._views[index][:] = surface.get_buffer()
+        frame = self.captured
+        self.captured += 1
+        self.timestamps.append((frame, round(start - self.started, 6)))
+        self._jobs.put((index, frame))
+        self.overhead.append(time.perf_counter() - start)
+        return True
+
+    # --- Encoders ---------------------------------------------------------
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            index, frame = job
+            start = time.perf_counter()
+            try:
+                if self._raw is not None:
+                    written = self._write_raw(self._views[index])
+                else:
+                    written = self._write_png(self._views[index], frame)
+            except Exception as e:  # a failed frame must not stop the encoder
+                print(f"Capture frame {frame} failed: {e}", file=sys.stderr)
+                written = 0
+            finally:
+                self._free.put(index)
+            with self._lock:
+                self.encoded += 1
+                self.bytes_written += written
+                self.encode_seconds += time.perf_counter() - start
+
+    def _write_raw(self, view):
+        row = self.width * 4
+        if self.pitch == row:
+            self._raw.write(view)
+        else:
+            for y in range(self.height):
+                self._raw.write(view[y * self.pitch:y * self.pitch + row])
+        return row * self.height
+
+    def _write_png(self, view, frame):
+        w, pitch = self.width, self.pitch
+        r, g, b = self.offsets
+        compressor = zlib.compressobj(PNG_LEVEL)
+        parts = []
+        for y0 in range(0, self.height, BAND_ROWS):
+            y1 = min(y0 + BAND_ROWS, self.height)
+            if pitch == w * 4:
+                pixels = bytes(view[y0 * pitch:y1 * pitch])
+            else:
+                pixels = b"".join(view[y * pitch:y * pitch + w * 4] for y in range(y0, y1))
+            rgb = bytearray(len(pixels) // 4 * 3)
+            rgb[0::3] = pixels[r::4]
+            rgb[1::3] = pixels[g::4]
+            rgb[2::3] = pixels[b::4]
+            # Scanlines: filter byte 0 (none) + RGB
+            band = bytearray()
+            rows = memoryview(rgb)
+            for i in range(0, len(rgb), w * 3):
+                band += b"\0"
+                band += rows[i:i + w * 3]
+            parts.append(compressor.compress(band))
+        parts.append(compressor.flush())
+        header = struct.pack(">IIBBBBB", w, self.height, 8, 2, 0, 0, 0)  # 8-bit RGB
+        data = (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+                + _png_chunk(b"IDAT", b"".join(parts)) + _png_chunk(b"IEND", b""))
+        with open(os.path.join(self.out_dir, f"frame_{frame:06d}.png"), "wb") as f:
+            f.write(data)
+        return len(data)
+
+    # --- Results ----------------------------------------------------------
+    def stats(self):
+        times = sorted(self.overhead)
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "encoded": self.encoded,
+            "bytes_written": self.bytes_written,
+            "overhead_p50_ms": percentile(times, 50) * 1000.0,
+            "overhead_p99_ms": percentile(times, 99) * 1000.0,
+            "overhead_max_ms": (times[-1] if times else 0.0) * 1000.0,
+            "encode_avg_ms": self.encode_seconds / self.encoded * 1000.0 if self.encoded else 0.0,
+        }
+
+    def summary_text(self):
+        s = self.stats()
+        return (f"captured {s['captured']}, dropped {s['dropped']}, game thread "
+                f"p50 {s['overhead_p50_ms']:.2f} / p99 {s['overhead_p99_ms']:.2f} ms per frame, "
+                f"encode {s['encode_avg_ms']:.1f} ms avg")
+
+    def close(self, on_done=None):
+        """
+        Stop capturing and return the output directory. The encoders finish the
+        queued frames and capture.json is written on a background thread, so
+        the game thread never waits for them; on_done(self) runs there once it
+        is complete. wait() blocks until then.
+        """
+        for _ in self._workers:
+            self._jobs.put(None)
+        self._closer = threading.Thread(target=self._finish, args=(on_done,),
+                                        name="capture-close", daemon=True)
+        self._closer.start()
+        return self.out_dir
+
+    def wait(self, timeout=None):
+        """Block until close() has finished writing; True if it has."""
+        if self._closer is None:
+            return False
+        self._closer.join(timeout)
+        return not self._closer.is_alive()
+
+    def _finish(self, on_done):
+        for worker in self._workers:
+            worker.join()
+        if self._raw is not None:
+            self._raw.close()
+        meta = {
+            "format": self.format,
+            "width": self.width,
+            "height": self.height,
+            "pixel_format": self.pixel_format if self.format == "raw" else "rgb24",
+            "stats": self.stats(),
+            "timestamps": self.timestamps,
+        }
+        try:
+            with open(os.path.join(self.out_dir, "capture.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except OSError as e:
+            print(f"Capture metadata failed: {e}", file=sys.stderr)
+        if on_done is not None:
+            on_done(self)
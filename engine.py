@@ -0,0 +1,135 @@
+# engine.py
+"""
+Headless snake simulation core.
+
+Nothing in here touches pygame, so the engine can be stepped millions of
+times per second from tests and tooling.  SnakeGame (game.py) delegates all
+board logic to it and only keeps the drawing / input side.
+"""
+import random
+from collections import deque
+
+DIRECTIONS = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+OPPOSITES = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+# Food kinds. Part of the rules: each spawn also draws one of these from the
+# game RNG, so replays need the same list to stay deterministic.
+FOODS = ["🍇", "🍈", "🍉", "🍊", "🍋", "🍋‍🟩", "🍌", "🍍", "🥭", "🍐", "🍑", "🍒", "🍓", "🫐", "🥝", "🍎", "🍏"]
+
+# Results returned by SnakeEngine.step()
+STEP_MOVED = "moved"
+STEP_ATE = "ate"
+STEP_DEAD = "dead"
+
+
+def start_body(grid_height):
+    """Initial 3-segment snake, head first, facing RIGHT."""
+    mid_y = max(2, grid_height // 2)
+    return [(5, mid_y), (4, mid_y), (3, mid_y)]
+
+
+class SnakeEngine:
+    """
+    Board state for one snake.
+
+    The body is a deque (head at index 0) mirrored by a set of occupied cells,
+    so moving, growing and the self-collision test are all O(1).
+
+    Free cells are kept in a swap-remove array (``_free``) with a reverse
+    lookup (``_free_pos``), both indexed by ``y * grid_width + x``.  Picking a
+    random free cell for food is then a single O(1) choice at any fill level.
+    """
+
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.body = deque()
+        self.occupied = set()
+        self.direction = "RIGHT"
+        self.food = None
+        self._free = list(range(grid_width * grid_height))
+        self._free_pos = list(range(grid_width * grid_height))
+
+    def reset(self, body, direction="RIGHT"):
+        self.body = deque(body)
+        self.occupied = set(self.body)
+        self.direction = direction
+        self.food = None
+        size = self.grid_width * self.grid_height
+        self._free = list(range(size))
+        self._free_pos = list(range(size))
+        for cell in self.body:
+            self._take(cell)
+
+    # --- Free-cell index -------------------------------------------------
+    def _take(self, cell):
+        idx = cell[1] * self.grid_width + cell[0]
+        pos = self._free_pos[idx]
+        last = self._free.pop()
+        if last != idx:
+            self._free[pos] = last
+            self._free_pos[last] = pos
+        self._free_pos[idx] = -1
+
+    def _release(self, cell):
+        idx = cell[1] * self.grid_width + cell[0]
+        self._free_pos[idx] = len(self._free)
+        self._free.append(idx)
+
+    @property
+    def free_count(self):
+        return len(self._free)
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    def __len__(self):
+        return len(self.body)
+
+    def is_free(self, cell):
+        x, y = cell
+        return (0 <= x < self.grid_width and 0 <= y < self.grid_height
+                and cell not in self.occupied)
+
+    def place_food(self, cell):
+        self.food = cell
+
+    def spawn_food(self, rng=random):
+        """Put food on a random free cell. Returns the cell, or None if the board is full."""
+        if not self._free:
+            self.food = None
+            return None
+        idx = self._free[rng.randrange(len(self._free))]
+        self.food = (idx % self.grid_width, idx // self.grid_width)
+        return self.food
+
+    def change_direction(self, direction):
+        # Same rule as SnakeGame.change_direction: no instant 180° turns
+        if direction in OPPOSITES and direction != OPPOSITES[self.direction]:
+            self.direction = direction
+
+    def step(self, direction=None):
+        """Advance one tick. Returns STEP_MOVED, STEP_ATE or STEP_DEAD."""
+        if direction is not None:
+            self.direction = direction
+        head_x, head_y = self.body[0]
+        dx, dy = DIRECTIONS[self.direction]
+        new_head = (head_x + dx, head_y + dy)
+
+        # The tail still counts as occupied here (matches the original rules)
+        if (new_head in self.occupied or
+                new_head[0] < 0 or new_head[0] >= self.grid_width or
+                new_head[1] < 0 or new_head[1] >= self.grid_height):
+            return STEP_DEAD
+
+        self.body.appendleft(new_head)
+        self.occupied.add(new_head)
+        self._take(new_head)
+
+        if new_head == self.food:
+            return STEP_ATE
+        tail = self.body.pop()
+        self.occupied.discard(tail)
+        self._release(tail)
+        return STEP_MOVED
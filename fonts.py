@@ -0,0 +1,79 @@
+# fonts.py
+"""
+System font resolution with an on-disk cache.
+
+pygame.font.SysFont() scans every installed font the first time it is used
+(fontconfig's fc-list on Linux, the registry on Windows), which dominates
+cold start. get_font() resolves each (name, bold, italic) to a font file
+once, remembers the answer in FONT_CACHE_FILE and afterwards builds fonts
+straight from the file path without touching the system font list.
+
+resolve_font() and prefetch_font() only touch files and may run on a
+loader thread; get_font() creates the font and belongs on the main thread.
+"""
+import json
+import os
+import threading
+
+import pygame
+import pygame.sysfont
+
+from persistence import STORE
+
+FONT_CACHE_FILE = "font_cache.json"
+
+_lock = threading.Lock()
+_resolved = None  # "name|bold|italic" -> [path or None, synth_bold, synth_italic]
+_fonts = {}       # (name, size, bold, italic) -> pygame.font.Font
+
+
+def _load_cache():
+    global _resolved
+    if _resolved is not None:
+        return
+    _resolved = {}
+    try:
+        with open(FONT_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Drop entries whose font file has gone away (uninstalled / moved)
+        _resolved = {key: value for key, value in data.items()
+                     if value[0] is None or os.path.exists(value[0])}
+    except Exception:
+        pass
+
+
+def resolve_font(name, bold=False, italic=False):
+    """(path, synth_bold, synth_italic) exactly as SysFont would pick them."""
+    key = f"{name}|{int(bold)}|{int(italic)}"
+    with _lock:
+        _load_cache()
+        entry = _resolved.get(key)
+        if entry is None:
+            # SysFont hands its choice to the constructor; capture instead of building
+            entry = list(pygame.font.SysFont(name, 1, bold, italic,
+                                             constructor=lambda path, size, b, i: (path, b, i)))
+            _resolved[key] = entry
+            STORE.write(FONT_CACHE_FILE, json.dumps(_resolved, indent=1))
+    return tuple(entry)
+
+
+def prefetch_font(name, bold=False, italic=False):
+    """Resolve a font and read its file once, so the later get_font() finds it in the OS cache."""
+    path = resolve_font(name, bold, italic)[0]
+    if path:
+        with open(path, "rb") as f:
+            while f.read(1 << 20):
+                pass
+
+
+def get_font(name, size, bold=False, italic=False):
+    """Drop-in for pygame.font.SysFont(name, size, bold, italic), memoized per process."""
+    key = (name, size, bold, italic)
+    with _lock:
+        font = _fonts.get(key)
+    if font is None:
+        path, synth_bold, synth_italic = resolve_font(name, bold, italic)
+        font = pygame.sysfont.font_constructor(path, size, synth_bold, synth_italic)
+        with _lock:
+            font = _fonts.setdefault(key, font)
+    return font
@@ -6,18 +6,52 @@ import os
 import sys
 import time
 import math
-import platform
+import threading
+from collections import OrderedDict, deque
 
-# Optional emoji helper package (used on Windows if available)
-try:
-    import pygame_emojis as _pe
-except Exception:
-    _pe = None
+from engine import SnakeEngine, FOODS, OPPOSITES, STEP_ATE, STEP_DEAD, start_body
+from profiler import FrameProfiler, InputLatency
+from autopilot import Autopilot
+from replay import ReplayRecorder, HIGHSCORE_REPLAY_FILE, new_seed
+from snapshot import Snapshot, SNAPSHOT_FILE
+from persistence import STORE
+from scores import get_score_store
+from fonts import get_font, prefetch_font
+from viewport import ChunkedBoard
+from capture import FrameCapture
+
+# Optional emoji helper package (used on Windows if available). Imported on
+# first use by _load_pe() so it stays off the startup path.
+_pe = None
+_pe_checked = False
+
+def _load_pe():
+    global _pe, _pe_checked
+    if not _pe_checked:
+        _pe_checked = True
+        try:
+            import pygame_emojis
+            _pe = pygame_emojis
+        except Exception:
+            _pe = None
+    return _pe
 
 # --- Constants (kept compatible with a közeli eredeti verzióddal) ---
 GRID_SIZE = 32
 BASE_SPEED = 8.0
 SPEED_INCREMENT = 2.0
+RENDER_FPS = 100       # render cap while playing; 0 = unbounded (a vsync display paces it, see open_display)
+MAX_FRAME_TIME = 0.25  # seconds of simulation a single frame may catch up on
+PROFILE_OVERLAY_INTERVAL = 0.5  # seconds between profiler overlay refreshes
+ATTRACT_RESTART_DELAY = 3.0  # seconds the game-over screen stays up under autopilot
+INPUT_QUEUE_SIZE = 3   # direction presses buffered for upcoming moves (one per move)
+AUTOSAVE_INTERVAL = 5.0  # seconds of play between snapshots of the running game
+# Segments + replay events above which autosave is skipped: the game-thread copy
+# would cost over ~0.5 ms. Pausing, the menu and quitting still save.
+AUTOSAVE_MAX_COPY = 50_000
+# The only events run() handles; the rest are dropped by SDL before reaching the queue
+GAME_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN,
+               pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE]
 HIGHSCORE_FILE = "highscore.json"
 
 # Support both spellings: legacy typo file and corrected file
@@ -33,9 +67,73 @@ SKINS = [
     {"name": "White", "head": (255,255,255), "body": (255,255,255)}, # Placeholder / legendary
 ]
 
-FOODS = ["🍇", "🍈", "🍉", "🍊", "🍋", "🍋‍🟩", "🍌", "🍍", "🥭", "🍐", "🍑", "🍒", "🍓", "🫐", "🥝", "🍎", "🍏"]
-
 # --- Helpers -----------------------------------------------------------
+def size_arg(argv, flag):
+    """(w, h) from a "--flag=WxH" command-line argument, or None."""
+    value = next((arg.split("=", 1)[1] for arg in argv if arg.startswith(flag + "=")), None)
+    if not value or value.lower() == "native":
+        return None
+    return tuple(int(v) for v in value.lower().split("x"))
+
+# Whether open_display got a vsync'd renderer (vsync_active's fallback)
+_display_vsync = False
+
+def open_display(logical_size=None, vsync=False):
+    """
+    Fullscreen display. With logical_size (e.g. (1280, 720)) every frame is
+    drawn at that resolution and SDL scales it to the panel once per present
+    (pygame.SCALED), so fill-rate cost no longer grows with the panel.
+    Mouse positions arrive already mapped to logical coordinates. Scaling
+    is pixel-exact for integer ratios and linear otherwise.
+
+    With vsync every present waits for the panel's refresh. SDL only offers
+    that on a renderer, so the display is SCALED (1:1 without logical_size)
+    and SnakeGame then renders unbounded, paced by the flip (see
+    vsync_active). Without either option, or if SCALED is unavailable, the
+    native resolution is used without vsync.
+    """
+    global _display_vsync
+    _display_vsync = False
+    if logical_size or vsync:
+        pygame.display.init()
+        info = pygame.display.Info()
+        size = logical_size or (info.current_w, info.current_h)
+        integer = (info.current_w % size[0] == 0 and info.current_h % size[1] == 0
+                   and info.current_w // size[0] == info.current_h // size[1])
+        os.environ.setdefault("SDL_RENDER_SCALE_QUALITY", "nearest" if integer else "linear")
+        for sync in ((1, 0) if vsync else (0,)):
+            try:
+                screen = pygame.display.set_mode(size, pygame.FULLSCREEN | pygame.SCALED, vsync=sync)
+                _display_vsync = bool(sync)
+                return screen
+            except pygame.error as e:
+                what = "VSync" if sync else "Scaled display"
+                print(f"{what} unavailable ({e})", file=sys.stderr)
+    return pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+
+def vsync_active():
+    """
+    Best effort: True if presents on the current display wait for the refresh.
+    Asks the renderer (SDL_RENDERER_PRESENTVSYNC) through pygame's private
+    _get_renderer_info where it exists, else trusts what open_display got.
+    """
+    try:
+        info = pygame.display._get_renderer_info()
+    except (AttributeError, pygame.error):
+        return _display_vsync
+    return bool(info and info[1] & 0x4)
+
+def to_display_format(surf):
+    """
+    surf converted to the display's pixel format (keeping per-pixel alpha),
+    so blitting it needs no per-pixel conversion. Unchanged without a display.
+    """
+    if pygame.display.get_surface() is None:
+        return surf
+    if surf.get_flags() & pygame.SRCALPHA:
+        return surf.convert_alpha()
+    return surf.convert()
+
 def get_rainbow_color(i, t):
     freq = 0.3
     r = int(128 + 127 * math.sin(freq * i + t))
@@ -43,138 +141,180 @@ def get_rainbow_color(i, t):
     b = int(128 + 127 * math.sin(freq * i + t + 4))
     return (r, g, b)
 
+# Rainbow lookup table: one colour per phase step (phase = 0.3 * i + t, mod 2*pi)
+RAINBOW_PALETTE_SIZE = 128
+RAINBOW_PALETTE = [get_rainbow_color(0, 2 * math.pi * k / RAINBOW_PALETTE_SIZE)
+                   for k in range(RAINBOW_PALETTE_SIZE)]
+RAINBOW_GLOW = 12  # widest glow layer in px (layers: 12, 8, 4)
+SPRITE_COLORKEY = (255, 0, 255)  # transparent corners of skin sprites; no skin uses it
+
+def _build_rainbow_sprites(cell_size):
+    """
+    Pre-render the legendary segment (glow layers + core) once per palette
+    entry. Each sprite is cell_size + RAINBOW_GLOW wide and is blitted at the
+    cell position offset by -RAINBOW_GLOW // 2.
+    """
+    pad = RAINBOW_GLOW // 2
+    size = cell_size + RAINBOW_GLOW
+    sprites = []
+    for color in RAINBOW_PALETTE:
+        surf = pygame.Surface((size, size), pygame.SRCALPHA)
+        glow_color = (min(255, color[0]+80), min(255, color[1]+80), min(255, color[2]+80))
+        for glow in range(RAINBOW_GLOW, 0, -4):
+            glow_rect = pygame.Rect(pad-glow//2, pad-glow//2, cell_size+glow, cell_size+glow)
+            pygame.draw.rect(surf, glow_color, glow_rect, border_radius=cell_size//2)
+        pygame.draw.rect(surf, color, (pad, pad, cell_size, cell_size), border_radius=cell_size//2)
+        sprites.append(to_display_format(surf))
+    return sprites
+
+def build_skin_sprites(skin, cell_size):
+    """
+    (head, body) sprites for a standard skin: the rounded cell the game used
+    to rasterize per segment, drawn once. The corners are a colour key with
+    RLE acceleration, which blits several times faster than per-pixel alpha.
+    """
+    sprites = []
+    for part in ("head", "body"):
+        surf = pygame.Surface((cell_size, cell_size))
+        surf.fill(SPRITE_COLORKEY)
+        pygame.draw.rect(surf, skin[part], (0, 0, cell_size, cell_size), border_radius=cell_size // 4)
+        surf.set_colorkey(SPRITE_COLORKEY, pygame.RLEACCEL)
+        sprites.append(to_display_format(surf))
+    return tuple(sprites)
+
+def _parse_achievements(text):
+    return set(int(line) for line in text.splitlines() if line.strip().isdigit())
+
 def _read_achievement_file(path):
+    # Not-yet-written updates win over what is on disk
+    pending = STORE.pending(path)
+    if pending is not None:
+        return _parse_achievements(pending.decode("utf-8"))
     try:
         with open(path, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-            return set(int(line) for line in lines if line.strip().isdigit())
+            return _parse_achievements(f.read())
     except Exception:
         return set()
 
 def load_achievements():
     # Prefer corrected filename if present, otherwise fall back to legacy typo file
-    if os.path.exists(ACHIEVEMENT_FILE_PREFERRED):
+    if os.path.exists(ACHIEVEMENT_FILE_PREFERRED) or STORE.pending(ACHIEVEMENT_FILE_PREFERRED) is not None:
         return _read_achievement_file(ACHIEVEMENT_FILE_PREFERRED)
     if os.path.exists(ACHIEVEMENT_FILE_LEGACY):
         return _read_achievement_file(ACHIEVEMENT_FILE_LEGACY)
     return set()
 
 def save_achievements(achievements):
-    # Write both files for compatibility (so older installs still see the data)
-    try:
-        with open(ACHIEVEMENT_FILE_PREFERRED, "w", encoding="utf-8") as f:
-            for ach in sorted(achievements):
-                f.write(f"{ach}\n")
-    except Exception:
-        pass
+    # Write both files for compatibility (so older installs still see the data).
+    # Queued on the background writer; see persistence.py.
+    data = "".join(f"{ach}\n" for ach in sorted(achievements))
+    STORE.write(ACHIEVEMENT_FILE_PREFERRED, data)
+    STORE.write(ACHIEVEMENT_FILE_LEGACY, data)
+
+def load_highscore():
+    pending = STORE.pending(HIGHSCORE_FILE)
+    if pending is not None:
+        return json.loads(pending.decode("utf-8")).get("highscore", 0)
+    if os.path.exists(HIGHSCORE_FILE):
+        try:
+            with open(HIGHSCORE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f).get("highscore", 0)
+        except Exception:
+            return 0
+    return 0
+
+def load_snapshot():
+    """The saved game in progress (see snapshot.py), or None."""
+    data = STORE.pending(SNAPSHOT_FILE)
     try:
-        with open(ACHIEVEMENT_FILE_LEGACY, "w", encoding="utf-8") as f:
-            for ach in sorted(achievements):
-                f.write(f"{ach}\n")
-    except Exception:
-        pass
+        if data is None:
+            with open(SNAPSHOT_FILE, "rb") as f:
+                data = f.read()
+        return Snapshot.from_bytes(data) if data else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Could not load {SNAPSHOT_FILE}: {e}", file=sys.stderr)
+        return None
+
+def open_score_store():
+    """The shared SQLite score store (None if unavailable); imports the legacy files once."""
+    return get_score_store(legacy_highscore=HIGHSCORE_FILE,
+                           legacy_achievements=(ACHIEVEMENT_FILE_PREFERRED, ACHIEVEMENT_FILE_LEGACY))
 
 # --- Emoji renderer factory (robust across multiple pygame_emojis variants) -
+def _pe_backends():
+    """
+    Candidate pygame_emojis APIs as (name, fn(char, size) -> Surface) pairs, in
+    the order they should be tried. Only APIs the installed module exposes are listed.
+    """
+    backends = []
+    if hasattr(_pe, "load_emoji"):
+        # many forks take either a tuple or integer
+        backends.append(("load_emoji(size, size)", lambda char, size: _pe.load_emoji(char, (size, size))))
+        backends.append(("load_emoji(size)", lambda char, size: _pe.load_emoji(char, size)))
+    if hasattr(_pe, "render"):
+        backends.append(("render", lambda char, size: _pe.render(char, size)))
+    if hasattr(_pe, "render_emoji"):
+        backends.append(("render_emoji", lambda char, size: _pe.render_emoji(char, size)))
+    if hasattr(_pe, "draw"):
+        # if only draw() exists, draw to a temp surface
+        def draw_surface_first(char, size):
+            tmp = pygame.Surface((size, size), pygame.SRCALPHA)
+            _pe.draw(tmp, char, pygame.Rect(0, 0, size, size))
+            return tmp
+
+        def draw_char_first(char, size):
+            tmp = pygame.Surface((size, size), pygame.SRCALPHA)
+            _pe.draw(char, tmp, pygame.Rect(0, 0, size, size))
+            return tmp
+        backends.append(("draw(surface, char)", draw_surface_first))
+        backends.append(("draw(char, surface)", draw_char_first))
+    if hasattr(_pe, "emojis"):
+        # 'emojis' factory with render_text_and_emojis on a temp surface
+        def emojis_helper(char, size):
+            tmp = pygame.Surface((size, size), pygame.SRCALPHA)
+            helper = _pe.emojis(tmp)
+            try:
+                helper.render_text_and_emojis(char, (255, 255, 255), (0, 0), size)
+            except TypeError:
+                # maybe different signature
+                helper.render_text_and_emojis(char, (255, 255, 255), (0, 0), font_size=size)
+            return tmp
+        backends.append(("emojis", emojis_helper))
+    return backends
+
+
 def _make_emoji_renderer(cell_size):
     """
     Returns a function render_emoji(char, size) -> pygame.Surface.
-    Tries multiple APIs of pygame_emojis if present; otherwise uses a font render fallback.
+    The working pygame_emojis API (if any) is probed once here; the returned
+    function calls it directly. Otherwise uses a font render fallback.
     """
-    os_name = platform.system()
-
-    # If pygame_emojis is available, attempt to adapt to its available API
-    if _pe is not None:
-        # Try several possible APIs. We'll return a function that tries them in order.
-        def render_with_pe(char, size):
-            # 1) try load_emoji(char, size) or load_emoji(char, (w,h))
+    # If pygame_emojis is available, pick the first API that yields a Surface
+    if _load_pe() is not None:
+        probe = FOODS[0]
+        for _name, backend in _pe_backends():
             try:
-                if hasattr(_pe, "load_emoji"):
-                    # many forks take either a tuple or integer
-                    try:
-                        surf = _pe.load_emoji(char, (size, size))
-                        if isinstance(surf, pygame.Surface):
-                            return surf
-                    except Exception:
-                        pass
-                    try:
-                        surf = _pe.load_emoji(char, size)
-                        if isinstance(surf, pygame.Surface):
-                            return surf
-                    except Exception:
-                        pass
-                # 2) try render / render_emoji functions
-                if hasattr(_pe, "render"):
-                    try:
-                        surf = _pe.render(char, size)
-                        if isinstance(surf, pygame.Surface):
-                            return surf
-                    except Exception:
-                        pass
-                if hasattr(_pe, "render_emoji"):
-                    try:
-                        surf = _pe.render_emoji(char, size)
-                        if isinstance(surf, pygame.Surface):
-                            return surf
-                    except Exception:
-                        pass
-                # 3) try draw(surface, char, rect) - if only draw() exists, draw to a temp surface
-                if hasattr(_pe, "draw"):
-                    try:
-                        tmp = pygame.Surface((size, size), pygame.SRCALPHA)
-                        # Some implementations expect (surface, emoji, rect)
-                        try:
-                            _pe.draw(tmp, char, pygame.Rect(0,0,size,size))
-                        except TypeError:
-                            # maybe parameters order is different; try (char, surface, rect)
-                            try:
-                                _pe.draw(char, tmp, pygame.Rect(0,0,size,size))
-                            except Exception:
-                                pass
-                        return tmp
-                    except Exception:
-                        pass
-                # 4) 'emojis' factory with render_text_and_emojis
-                if hasattr(_pe, "emojis"):
-                    try:
-                        # create helper instance and call render_text_and_emojis on a temp surface
-                        tmp = pygame.Surface((size, size), pygame.SRCALPHA)
-                        helper = _pe.emojis(tmp)
-                        # some versions: helper.render_text_and_emojis(text, color, pos, size)
-                        try:
-                            helper.render_text_and_emojis(char, (255,255,255), (0,0), size)
-                        except TypeError:
-                            # maybe different signature
-                            try:
-                                helper.render_text_and_emojis(char, (255,255,255), (0,0), font_size=size)
-                            except Exception:
-                                pass
-                        return tmp
-                    except Exception:
-                        pass
+                if isinstance(backend(probe, cell_size), pygame.Surface):
+                    return backend
             except Exception:
                 pass
-            # If all attempts fail, raise to let caller fallback
-            raise RuntimeError("pygame_emojis available but all tried APIs failed")
-        # Use the sprite-based renderer on Windows (more reliable there), otherwise still attempt PE.
-        return render_with_pe
 
     # Fallback: use system fonts (Noto Color Emoji on Linux, Segoe UI Emoji on Windows)
     # If neither supports color emojis the characters may still render monochrome.
     try:
         # prefer Noto Color Emoji (common on Linux)
-        emoji_font = pygame.font.SysFont("Noto Color Emoji", int(cell_size * 0.9))
+        emoji_font = get_font("Noto Color Emoji", int(cell_size * 0.9))
     except Exception:
         try:
-            emoji_font = pygame.font.SysFont("Segoe UI Emoji", int(cell_size * 0.9))
+            emoji_font = get_font("Segoe UI Emoji", int(cell_size * 0.9))
         except Exception:
-            emoji_font = pygame.font.SysFont(None, int(cell_size * 0.9))
+            emoji_font = get_font(None, int(cell_size * 0.9))
 
     def render_with_font(char, size):
         try:
-            surf = emoji_font.render(char, True, (255, 255, 255))
-            if surf.get_width() != size or surf.get_height() != size:
-                surf = pygame.transform.smoothscale(surf, (size, size))
-            return surf
+            return emoji_font.render(char, True, (255, 255, 255))
         except Exception:
             # final fallback: small colored circle surface
             tmp = pygame.Surface((size, size), pygame.SRCALPHA)
@@ -183,29 +323,328 @@ def _make_emoji_renderer(cell_size):
 
     return render_with_font
 
+
+class EmojiCache:
+    """
+    Per-(char, size) cache of ready-to-blit emoji surfaces.
+
+    Each entry is rendered once with the resolved backend, scaled to size and
+    converted to the display format, so drawing food is a single blit.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, char, size):
+        key = (char, size)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            return surf
+        self.misses += 1
+        try:
+            surf = self.render(char, size)
+        except Exception:
+            surf = None
+        if not isinstance(surf, pygame.Surface):
+            # fallback: plain circle
+            surf = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (255, 120, 120), (size//2, size//2), size//2 - 2)
+        if surf.get_size() != (size, size):
+            surf = pygame.transform.smoothscale(surf, (size, size))
+        surf = to_display_format(surf)
+        self.surfaces[key] = surf
+        return surf
+
+    def prewarm(self, chars, size):
+        for char in chars:
+            self.get(char, size)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.surfaces)}
+
+
+class TextCache:
+    """
+    LRU cache of rendered text surfaces keyed by (font, text, color, antialias).
+    Shared by the game screens and menu.py so static labels are rasterized once.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = to_display_format(font.render(text, antialias, color))
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.surfaces)}
+
+
+TEXT_CACHE = TextCache()
+
+_emoji_caches = {}
+_emoji_lock = threading.Lock()
+
+def get_emoji_cache(cell_size=GRID_SIZE, prewarm=True):
+    """Process-wide food atlas for cell_size; the emoji backend is resolved on first call."""
+    with _emoji_lock:
+        cache = _emoji_caches.get(cell_size)
+        if cache is None:
+            cache = EmojiCache(_make_emoji_renderer(cell_size))
+            _emoji_caches[cell_size] = cache
+    if prewarm:
+        cache.prewarm(FOODS, cell_size)
+    return cache
+
+def prefetch_assets():
+    """Find and read the game's font files; no surfaces, so menu.py runs it on a loader thread."""
+    prefetch_font("Consolas")
+    prefetch_font("Consolas", bold=True)
+    prefetch_font("Noto Color Emoji")
+
+def build_assets():
+    """
+    Generator creating the game fonts and the food atlas one piece per
+    next(), so menu.py can spread them over its frames (main thread only).
+    """
+    get_font("Consolas", 24)
+    yield
+    get_font("Consolas", 48, bold=True)
+    yield
+    get_font("Consolas", 32)
+    yield
+    cache = get_emoji_cache(GRID_SIZE, prewarm=False)
+    for char in FOODS:
+        yield
+        cache.get(char, GRID_SIZE)
+
+def render_text(font, text, color, antialias=True):
+    """Cached drop-in for font.render(text, antialias, color)."""
+    return TEXT_CACHE.render(font, text, color, antialias)
+
+
+class ScreenLayers:
+    """
+    Cached layers the game screens are composed from, all in the display's
+    pixel format:
+    - background: backdrop, play-area border and the empty score bar;
+      incremental frames repaint cells from it
+    - hud: the score bar with its text, rebuilt only when the text changes
+    - overlays: pause / game-over titles and buttons, cropped to their
+      bounding box on a transparent layer
+    - frozen: the last board frame with its overlay, composed once when the
+      pause or game-over screen appears and blitted as is afterwards
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        background = pygame.Surface((width, height))
+        background.fill((40, 40, 40))
+        pygame.draw.rect(background, (200, 200, 200), (0, 60, width, height-60), 2)
+        pygame.draw.rect(background, (30, 30, 30), (0, 0, width, 60))
+        self.background = to_display_format(background)
+        self.hud = None
+        self.hud_key = None
+        self.overlays = {}
+        self.frozen = None
+        self.frozen_key = None
+
+    def hud_bar(self, key, text, font):
+        """The score bar showing text; key identifies its content."""
+        if key != self.hud_key or self.hud is None:
+            bar = self.background.subsurface((0, 0, self.width, 60)).copy()
+            bar.blit(font.render(text, True, (255, 255, 255)), (20, 20))
+            self.hud = to_display_format(bar)
+            self.hud_key = key
+        return self.hud
+
+    def overlay(self, title, buttons, big_font, button_font):
+        """
+        A title over a column of (label, color) buttons, centered on the
+        screen. Returns (surface, screen position, button rects).
+        """
+        key = (title, tuple(buttons))
+        cached = self.overlays.get(key)
+        if cached is None:
+            items = [big_font.render(title, True, (255, 255, 255))]
+            items[0] = (items[0], items[0].get_rect(midtop=(self.width // 2, 120)))
+            for i, (label, color) in enumerate(buttons):
+                text = button_font.render(label, True, color)
+                items.append((text, text.get_rect(center=(self.width // 2, 300 + 60 * i))))
+            bounds = items[0][1].unionall([rect for _, rect in items[1:]])
+            surf = pygame.Surface(bounds.size, pygame.SRCALPHA)
+            for text, rect in items:
+                surf.blit(text, rect.move(-bounds.x, -bounds.y))
+            rects = [rect for _, rect in items[1:]]
+            cached = self.overlays[key] = (to_display_format(surf), bounds.topleft, rects)
+        return cached
+
+    def freeze(self, screen, key):
+        self.frozen = screen.copy()
+        self.frozen_key = key
+
+# --- Session --------------------------------------------------------------
+class GameSession:
+    """
+    Everything that outlives a single game: fonts, the food atlas, screen
+    layers, the persisted highscore / achievements, the score store and the
+    music. menu.py keeps one for the whole process and reuses its SnakeGame;
+    starting or restarting a game then only resets the board.
+    """
+
+    def __init__(self, screen, start_music=True):
+        pygame.init()
+        self.screen = screen
+        self.size = screen.get_size()
+        self.font = get_font("Consolas", 24)
+        self.big_font = get_font("Consolas", 48, bold=True)
+        self.button_font = get_font("Consolas", 32)
+        # emoji renderer (backend resolved once) + shared pre-rendered food atlas
+        self.emoji_cache = get_emoji_cache(GRID_SIZE)
+        self.layers = ScreenLayers(screen.get_width(), screen.get_height())
+        self.clock = pygame.time.Clock()
+        self.highscore = load_highscore()
+        self.achievements = load_achievements()
+        self.scores = open_score_store()
+        if start_music:
+            self.start_music()
+
+    @staticmethod
+    def start_music():
+        # Ensure music tries to run (menu.py manages it itself; this is for direct runs)
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            if not pygame.mixer.music.get_busy():
+                if os.path.exists("music1.mp3"):
+                    pygame.mixer.music.load("music1.mp3")
+                    pygame.mixer.music.set_volume(0.4)
+                    pygame.mixer.music.play(-1)
+        except Exception:
+            pass
+
+_session = None
+
+def get_session(screen):
+    """
+    The process-wide session for screen. set_mode() hands back the same
+    surface after a resize, so a new size also gets a new session (layers).
+    """
+    global _session
+    if _session is None or _session.screen is not screen or _session.size != screen.get_size():
+        _session = GameSession(screen)
+    return _session
+
 # --- Main game class ----------------------------------------------------
 class SnakeGame:
-    def __init__(self, screen, skin_idx=0, legendary_unlocked=False):
-        pygame.init()
+    def __init__(self, screen, skin_idx=0, legendary_unlocked=False, incremental=True,
+                 render_fps=None, profile=False, seed=None, replay_dir=None,
+                 autopilot=False, on_autopilot_decision=None, board_size=None, session=None,
+                 capture=None):
+        # Shared resources and persisted state; see GameSession
+        self.session = session if session is not None else get_session(screen)
         self.screen = screen
         self.screen_width = screen.get_width()
         self.screen_height = screen.get_height()
-        self.grid_width = max(4, self.screen_width // GRID_SIZE)
-        self.grid_height = max(4, (self.screen_height - 60) // GRID_SIZE)
+        if board_size is not None:
+            # Big board: any size, seen through a camera that follows the head
+            self.grid_width, self.grid_height = board_size
+        else:
+            self.grid_width = max(4, self.screen_width // GRID_SIZE)
+            self.grid_height = max(4, (self.screen_height - 60) // GRID_SIZE)
+        self.engine = SnakeEngine(self.grid_width, self.grid_height)
 
-        self.font = pygame.font.SysFont("Consolas", 24)
-        self.big_font = pygame.font.SysFont("Consolas", 48, bold=True)
-        self.button_font = pygame.font.SysFont("Consolas", 32)
+        # Per-game RNG + replay recording. A fixed seed makes every game of
+        # this instance reproducible; replay_dir (if set) keeps every replay.
+        self.fixed_seed = seed
+        self.replay_dir = replay_dir
+        self.rng = random.Random()
+        self.recorder = None
+        self.last_replay = None
+        self.tick = 0
+        # Snapshot of this game on disk (Continue in the menu); see save_snapshot
+        self.saved_snapshot = False
+        self.last_autosave = 0.0
 
-        # emoji renderer (robust)
-        self.render_emoji = _make_emoji_renderer(GRID_SIZE)
+        self.font = self.session.font
+        self.big_font = self.session.big_font
+        self.button_font = self.session.button_font
+        self.emoji_cache = self.session.emoji_cache
+        self.render_emoji = self.emoji_cache.render
 
-        self.clock = pygame.time.Clock()
-        self.highscore = self.load_highscore()
+        self.clock = self.session.clock
+        # Render cap; None picks RENDER_FPS, or unbounded if the flip waits for vsync
+        if render_fps is None:
+            render_fps = 0 if vsync_active() else RENDER_FPS
+        self.render_fps = render_fps
         self.state = "menu"
         self.skin_idx = max(0, min(skin_idx, len(SKINS)-1))
         self.legendary_unlocked = legendary_unlocked
-        self.achievements = load_achievements()
+        self.scores = self.session.scores
+
+        # Dirty-rectangle rendering: only changed cells + HUD are redrawn and
+        # presented with display.update(). Full redraws still happen for the
+        # legendary skin, overlays and the first frame after a state change.
+        self.incremental = incremental
+        self.dirty_cells = set()
+        self.needs_full_redraw = True
+        self._hud_key = None
+        self.layers = self.session.layers
+        # Big-board mode draws through cached chunks instead (see viewport.py)
+        self.viewport = None
+        if board_size is not None:
+            self.viewport = ChunkedBoard(self.grid_width, self.grid_height, GRID_SIZE,
+                                         (0, 60, self.screen_width, self.screen_height - 60),
+                                         self.cell_filled, self.paint_cell)
+
+        # Direction presses waiting for their move: (direction, pressed_at)
+        self.input_queue = deque()
+        self.input_latency = InputLatency()
+
+        # Frame profiler (F3 toggles it + the score-bar overlay, F4 exports)
+        self.profiler = None
+        self._profiler_surf = None
+        self._profiler_updated = 0.0
+        if profile:
+            self.toggle_profiler()
+
+        # Gameplay capture (F6 toggles it); capture="png" / "raw" starts it with
+        # run(). See capture.py: the game thread only copies each frame.
+        self.capture = None
+        self.capture_format = capture
+
+        # Autopilot (F2 toggles it). Games it touched are not recorded as
+        # scores; with it on, game over restarts by itself (attract mode).
+        # on_autopilot_decision(seconds, mode) is called after every decision.
+        self.autopilot = None
+        self.on_autopilot_decision = on_autopilot_decision
+        self.assisted = False
+        self.finished_at = 0.0
+        if autopilot:
+            self.toggle_autopilot()
+
+        # Skin sprites: legendary built on first use, standard ones per skin/cell size
+        self.rainbow_sprites = None
+        self._skin_sprites = None
+        self._skin_sprites_key = None
 
         # UI rects (populated by draw_menu / draw_gameover / draw_pause)
         self.start_btn_rect = None
@@ -216,33 +655,107 @@ class SnakeGame:
         self.exit_btn_rect = None
         self.resume_btn_rect = None
 
-        # Ensure music tries to run (menu usually sets it, but handle direct run too)
-        try:
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-            if not pygame.mixer.music.get_busy():
-                if os.path.exists("music1.mp3"):
-                    pygame.mixer.music.load("music1.mp3")
-                    pygame.mixer.music.set_volume(0.4)
-                    pygame.mixer.music.play(-1)
-        except Exception:
-            pass
+    # Persisted state lives on the session, shared by every game
+    @property
+    def highscore(self):
+        return self.session.highscore
+
+    @highscore.setter
+    def highscore(self, value):
+        self.session.highscore = value
+
+    @property
+    def achievements(self):
+        return self.session.achievements
+
+    @achievements.setter
+    def achievements(self, value):
+        self.session.achievements = value
 
     # --- Game control methods ---
     def start_game(self):
         self.direction = "RIGHT"
-        mid_y = max(2, self.grid_height // 2)
-        self.snake = [(5, mid_y), (4, mid_y), (3, mid_y)]
+        self.input_queue.clear()
+        self.seed = self.fixed_seed if self.fixed_seed is not None else new_seed()
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.play_time = 0.0
+        self.start_highscore = self.highscore
+        self.assisted = self.autopilot is not None
+        if self.autopilot is not None:
+            self.autopilot.reset()
+        self.recorder = ReplayRecorder(self.grid_width, self.grid_height, self.seed, self.direction)
+        self.engine.reset(start_body(self.grid_height), self.direction)
         self.food = self.create_food()
         self.score = 0
         self.state = "game"
-        self.last_move_time = time.time()
+        self.needs_full_redraw = True
+        self.layers.frozen = None
+        if self.viewport is not None:
+            self.viewport.invalidate()
+            size = GRID_SIZE
+            self.viewport.camera.center_on(self.snake[0][0] * size, self.snake[0][1] * size)
         self.speed = BASE_SPEED
+        self.reset_tick_clock()
+        # The first autosave replaces any saved game; until then the save is not ours
+        self.last_autosave = self.last_tick_time
+        self.saved_snapshot = False
 
     def restart_game(self):
         self.start_game()
 
+    def take_snapshot(self):
+        food = (self.food[0][1] * self.grid_width + self.food[0][0], FOODS.index(self.food[1])) if self.food else None
+        replay = self.recorder.partial(self.tick, self.score)
+        return Snapshot.from_engine(self.engine, self.rng, replay, food=food, seed=self.seed, tick=self.tick,
+                                    score=self.score, start_highscore=self.start_highscore,
+                                    play_time=self.play_time, assisted=self.assisted)
+
+    def restore_snapshot(self, snapshot):
+        """Carry on with a saved game; it opens paused. Raises ValueError if the board size differs."""
+        if (snapshot.grid_width, snapshot.grid_height) != (self.grid_width, self.grid_height):
+            raise ValueError(f"saved game is {snapshot.grid_width}x{snapshot.grid_height}, "
+                             f"this board is {self.grid_width}x{self.grid_height}")
+        self.input_queue.clear()
+        self.seed = snapshot.seed
+        self.rng = random.Random()
+        self.rng.setstate(snapshot.rng_state)
+        self.tick = snapshot.tick
+        self.play_time = snapshot.play_time
+        self.start_highscore = snapshot.start_highscore
+        self.assisted = snapshot.assisted or self.autopilot is not None
+        if self.autopilot is not None:
+            self.autopilot.reset()
+        snapshot.restore_engine(self.engine)
+        self.direction = snapshot.direction
+        self.recorder = ReplayRecorder(self.grid_width, self.grid_height, self.seed)
+        self.recorder.replay = snapshot.replay
+        self.recorder.last_direction = self.direction
+        self.recorder.resume(self.tick)
+        self.food = (self.engine.food, FOODS[snapshot.food[1]]) if snapshot.food else None
+        self.score = snapshot.score
+        self.speed = BASE_SPEED + (self.score // 10) * SPEED_INCREMENT
+        self.state = "pause"
+        self.needs_full_redraw = True
+        self.layers.frozen = None
+        if self.viewport is not None:
+            self.viewport.invalidate()
+            size = GRID_SIZE
+            self.viewport.camera.center_on(self.snake[0][0] * size, self.snake[0][1] * size)
+        self.saved_snapshot = True
+        self.reset_tick_clock()
+
+    @property
+    def snake(self):
+        # Head-first deque owned by the engine; supports len(), [0] and iteration
+        return self.engine.body
+
     def exit_game(self):
+        if self.capture is not None:
+            self.toggle_capture(wait=True)  # the process ends next: finish the files
+        if self.state in ("game", "pause"):
+            self.save_snapshot()
+        STORE.close()
         pygame.quit()
         sys.exit()
 
@@ -251,67 +764,261 @@ class SnakeGame:
 
     def pause_game(self):
         self.state = "pause"
+        self.save_snapshot()
 
     def resume_game(self):
         self.state = "game"
+        self.needs_full_redraw = True
+        self.layers.frozen = None
+        # Time spent paused must not be simulated
+        self.reset_tick_clock()
 
-    def change_direction(self, key):
-        opposites = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
-        if key in opposites and key != opposites[self.direction]:
-            self.direction = key
+    def reset_tick_clock(self):
+        self.last_tick_time = time.perf_counter()
+        self.tick_accumulator = 0.0
 
-    def move(self):
-        head_x, head_y = self.snake[0]
-        dx, dy = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}[self.direction]
-        new_head = (head_x + dx, head_y + dy)
+    def advance_simulation(self):
+        """
+        Fixed-timestep update: accumulate real (monotonic) time and run one
+        move() per whole 1/speed interval, carrying the remainder over so the
+        effective speed matches self.speed exactly.
+        """
+        now = time.perf_counter()
+        elapsed = min(now - self.last_tick_time, MAX_FRAME_TIME)
+        self.tick_accumulator += elapsed
+        self.play_time += elapsed
+        self.last_tick_time = now
+        move_interval = 1.0 / self.speed
+        while self.state == "game" and self.tick_accumulator >= move_interval:
+            self.tick_accumulator -= move_interval
+            if self.autopilot is not None:
+                self.input_queue.clear()
+                self.change_direction(self.autopilot.decide(self.engine))
+            self.move()
+            move_interval = 1.0 / self.speed
 
-        if (new_head in self.snake or
-            new_head[0] < 0 or new_head[0] >= self.grid_width or
-            new_head[1] < 0 or new_head[1] >= self.grid_height):
-            self.state = "gameover"
+    def toggle_profiler(self):
+        if self.profiler is None:
+            self.profiler = FrameProfiler(target_fps=self.render_fps)
+        else:
+            self.profiler = None
+        self._profiler_surf = None
+        self.needs_full_redraw = True
+        self.layers.frozen = None
+
+    def toggle_capture(self, wait=False):
+        if self.capture is None:
+            self.capture = FrameCapture.for_surface(self.screen, self.capture_format or "png")
+        else:
+            # Encoders drain in the background; the game keeps running meanwhile
+            capture, self.capture = self.capture, None
+            capture.close(on_done=lambda c: print(f"Capture saved to {c.out_dir}: {c.summary_text()}"))
+            if wait:
+                capture.wait()
+        self._hud_key = None
+        self.layers.frozen = None
+
+    def toggle_autopilot(self):
+        if self.autopilot is None:
+            self.autopilot = Autopilot(self.grid_width, self.grid_height,
+                                       on_decision=self.on_autopilot_decision)
+            self.assisted = True
+        else:
+            self.autopilot = None
+        self._hud_key = None
+        self.layers.frozen = None
+
+    def export_profile(self):
+        """Write the recorded frames as a Chrome trace and a CSV file."""
+        if self.profiler is None:
+            return None
+        return self.profiler.export_chrome_trace(), self.profiler.export_csv()
+
+    def change_direction(self, key, pressed_at=None):
+        """
+        Queue a direction for an upcoming move, one per move, so quick presses
+        inside one move interval are all kept. Presses that repeat or reverse
+        the direction before them are dropped, as are presses past
+        INPUT_QUEUE_SIZE.
+        """
+        if key not in OPPOSITES:
+            return
+        last = self.input_queue[-1][0] if self.input_queue else self.direction
+        if key == last or key == OPPOSITES[last] or len(self.input_queue) >= INPUT_QUEUE_SIZE:
             return
+        self.input_queue.append((key, pressed_at))
 
-        self.snake.insert(0, new_head)
+    def apply_queued_direction(self):
+        """Take the next queued direction that does not reverse the last committed move."""
+        while self.input_queue:
+            key, pressed_at = self.input_queue.popleft()
+            if key != OPPOSITES[self.direction]:
+                self.direction = key
+                if pressed_at is not None:
+                    self.input_latency.applied(pressed_at)
+                return
 
-        if new_head == self.food[0]:
+    def move(self):
+        prev_head = self.snake[0]
+        prev_tail = self.snake[-1]
+        prev_food = self.food[0] if self.food else None
+        self.apply_queued_direction()
+        if self.recorder is not None:
+            self.recorder.record(self.tick, self.direction)
+        result = self.engine.step(self.direction)
+        self.tick += 1
+        if result == STEP_DEAD:
+            self.state = "gameover"
+            self.finish_game()
+            return
+
+        if result == STEP_ATE:
             self.score += 1
-            if self.score > self.highscore:
+            if self.score > self.highscore and not self.assisted:
                 self.highscore = self.score
                 self.save_highscore()
                 self.check_achievements(self.highscore)
             self.food = self.create_food()
+            if self.food is None:
+                self.state = "win"
+                self.finish_game()
+            else:
+                self.dirty_cells.add(self.food[0])
             self.speed = BASE_SPEED + (self.score // 10) * SPEED_INCREMENT
         else:
-            self.snake.pop()
+            self.dirty_cells.add(prev_tail)
+        # new head, old head (recoloured as body) and the eaten food cell
+        self.dirty_cells.update((self.snake[0], prev_head))
+        if prev_food is not None:
+            self.dirty_cells.add(prev_food)
+
+    def finish_game(self):
+        """Game over (or won): close the replay and add the game to the score history."""
+        replay = self.finish_replay()
+        self.finished_at = time.perf_counter()
+        if self.saved_snapshot:
+            STORE.remove(SNAPSHOT_FILE)
+            self.saved_snapshot = False
+        if self.scores is None or self.assisted:
+            return replay
+        try:
+            self.scores.record_game(self.score, len(self.snake), self.play_time,
+                                    SKINS[self.skin_idx]["name"], self.seed)
+            self.scores.unlock_achievements(self.achievements)
+        except Exception as e:
+            print(f"Could not record game: {e}", file=sys.stderr)
+        return replay
+
+    def finish_replay(self):
+        """Close the running recording; keep it on disk if it set a new record."""
+        if self.recorder is None:
+            return None
+        replay = self.recorder.finish(self.tick, self.score)
+        self.recorder = None
+        self.last_replay = replay
+        # Queued like the other save files; write errors are reported by the store
+        if self.score > self.start_highscore or self.replay_dir:
+            data = replay.to_bytes()
+            if self.score > self.start_highscore:
+                STORE.write(HIGHSCORE_REPLAY_FILE, data)
+            if self.replay_dir:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}_{self.seed:016x}.snr"
+                STORE.write(os.path.join(self.replay_dir, name), data)
+        # Game over: get the replays, new highscore and achievements on disk now
+        STORE.flush(wait=False)
+        return replay
+
+    @property
+    def legendary_active(self):
+        return self.skin_idx == 4 and self.legendary_unlocked
 
     # --- Drawing methods ---
     def draw(self):
+        if self.viewport is not None:
+            self.draw_viewport()
+            return
+        # A solid fill beats copying the full-screen background layer
         self.screen.fill((40, 40, 40))
         # Draw play area border
         pygame.draw.rect(self.screen, (200, 200, 200), (0, 60, self.screen_width, self.screen_height-60), 2)
 
-        skin = SKINS[self.skin_idx]
-        t = time.time()
-        for i, (x, y) in enumerate(self.snake):
-            if self.skin_idx == 4 and self.legendary_unlocked:  # Legendary rainbow effect
-                color = get_rainbow_color(i, t)
-                for glow in range(12, 0, -4):
-                    glow_color = (min(255, color[0]+80), min(255, color[1]+80), min(255, color[2]+80))
-                    glow_rect = pygame.Rect(x*GRID_SIZE-glow//2, y*GRID_SIZE+60-glow//2, GRID_SIZE+glow, GRID_SIZE+glow)
-                    pygame.draw.rect(self.screen, glow_color, glow_rect, border_radius=GRID_SIZE//2)
-                pygame.draw.rect(self.screen, color, (x*GRID_SIZE, y*GRID_SIZE+60, GRID_SIZE, GRID_SIZE), border_radius=GRID_SIZE//2)
+        if self.legendary_active:  # Legendary rainbow effect
+            self.draw_rainbow_snake(time.time())
+        else:
+            self.draw_snake()
+
+        self.draw_food()
+        self.draw_hud()
+        # Everything is on screen now; incremental frames can build on it
+        self.dirty_cells.clear()
+        self.needs_full_redraw = False
+
+    def skin_sprites(self):
+        """(head, body) sprites of the current skin, rebuilt when the skin or cell size changes."""
+        key = (self.skin_idx, GRID_SIZE)
+        if key != self._skin_sprites_key:
+            self._skin_sprites = build_skin_sprites(SKINS[self.skin_idx], GRID_SIZE)
+            self._skin_sprites_key = key
+        return self._skin_sprites
+
+    def draw_snake(self):
+        # The whole snake in one blits() call of pre-rendered sprites
+        head, body = self.skin_sprites()
+        blits = [(body, (x*GRID_SIZE, y*GRID_SIZE+60)) for x, y in self.snake]
+        blits[0] = (head, blits[0][1])
+        self.screen.blits(blits, doreturn=False)
+
+    def draw_viewport(self):
+        """Big board: only the chunks in view, patched with this tick's cells."""
+        self.viewport.update(self.dirty_cells)
+        self.viewport.draw(self.screen, self.snake[0])
+        if self.food is not None:
+            self.viewport.draw_marker(self.screen, self.food[0], (255, 120, 120))
+        self.draw_hud()
+        self.dirty_cells.clear()
+        self.needs_full_redraw = False
+
+    def cell_filled(self, cell):
+        return cell in self.engine.occupied or (self.food is not None and cell == self.food[0])
+
+    def paint_cell(self, surface, rect, cell):
+        """Snake segment or food for one cell of a cached chunk."""
+        if cell in self.engine.occupied:
+            if self.legendary_active:
+                # Chunks are static: the rainbow runs across the board instead of along the snake
+                color = RAINBOW_PALETTE[(cell[0] + cell[1]) % RAINBOW_PALETTE_SIZE]
+                pygame.draw.rect(surface, color, rect, border_radius=8)
             else:
-                color = skin["head"] if i == 0 else skin["body"]
-                pygame.draw.rect(self.screen, color, (x*GRID_SIZE, y*GRID_SIZE+60, GRID_SIZE, GRID_SIZE), border_radius=8)
+                head, body = self.skin_sprites()
+                surface.blit(head if cell == self.snake[0] else body, rect)
+        else:
+            surface.blit(self.emoji_cache.get(self.food[1], GRID_SIZE), rect)
+
+    def draw_rainbow_snake(self, t):
+        # Palette lookup instead of three sin() calls per segment, and one
+        # batched blits() of pre-rendered sprites instead of 4 rounded rects each
+        if self.rainbow_sprites is None:
+            self.rainbow_sprites = _build_rainbow_sprites(GRID_SIZE)
+        sprites = self.rainbow_sprites
+        n = len(sprites)
+        scale = n / (2 * math.pi)
+        phase = t * scale
+        step = 0.3 * scale
+        pad = RAINBOW_GLOW // 2
+        self.screen.blits(
+            [(sprites[int(phase + i * step) % n], (x*GRID_SIZE - pad, y*GRID_SIZE + 60 - pad))
+             for i, (x, y) in enumerate(self.snake)],
+            doreturn=False,
+        )
 
-        # Draw food (emoji) with robust renderer
+    def draw_food(self):
+        # Draw food (emoji) with robust renderer (no food once the board is full)
+        if self.food is None:
+            return
         fx, fy = self.food[0]
         emoji = self.food[1]
         try:
-            emoji_surf = self.render_emoji(emoji, GRID_SIZE)
-            # ensure correct size
-            if emoji_surf.get_size() != (GRID_SIZE, GRID_SIZE):
-                emoji_surf = pygame.transform.smoothscale(emoji_surf, (GRID_SIZE, GRID_SIZE))
+            emoji_surf = self.emoji_cache.get(emoji, GRID_SIZE)
             self.screen.blit(emoji_surf, (fx*GRID_SIZE, fy*GRID_SIZE+60))
         except Exception:
             # fallback: plain circle
@@ -319,19 +1026,74 @@ class SnakeGame:
                                (fx*GRID_SIZE + GRID_SIZE//2, fy*GRID_SIZE + 60 + GRID_SIZE//2),
                                GRID_SIZE//2 - 2)
 
-        # Draw score bar
-        pygame.draw.rect(self.screen, (30, 30, 30), (0, 0, self.screen_width, 60))
-        score_text = self.font.render(f"Score: {getattr(self,'score',0)}    Highscore: {self.highscore}", True, (255, 255, 255))
-        self.screen.blit(score_text, (20, 20))
+    def hud_state(self):
+        return (getattr(self, "score", 0), self.highscore, self.autopilot is not None,
+                self.capture is not None)
+
+    def draw_hud(self):
+        # The cached bar is only re-rendered when score/highscore/autopilot change
+        hud_key = self.hud_state()
+        text = f"Score: {hud_key[0]}    Highscore: {hud_key[1]}"
+        if hud_key[2]:
+            text += "    AUTOPILOT"
+        if hud_key[3]:
+            text += "    REC"
+        self.screen.blit(self.layers.hud_bar(hud_key, text, self.font), (0, 0))
+        self._hud_key = hud_key
+        if self.profiler is not None:
+            self.draw_profiler_overlay()
+
+    def draw_profiler_overlay(self):
+        """Frame-time stats in the right half of the score bar. Returns the rect drawn."""
+        now = time.perf_counter()
+        if self._profiler_surf is None or now - self._profiler_updated >= PROFILE_OVERLAY_INTERVAL:
+            text = self.profiler.summary_text()
+            if self.input_latency.count:
+                text += "  " + self.input_latency.summary_text()
+            self._profiler_surf = self.font.render(text, True, (255, 200, 0))
+            self._profiler_updated = now
+        rect = pygame.Rect(self.screen_width // 2, 0, self.screen_width - self.screen_width // 2, 60)
+        pygame.draw.rect(self.screen, (30, 30, 30), rect)
+        self.screen.blit(self._profiler_surf, self._profiler_surf.get_rect(midright=(self.screen_width - 20, 30)))
+        return rect
+
+    def draw_dirty(self):
+        """
+        Redraw only the cells touched since the last frame (plus the HUD if the
+        score changed). Returns the list of rects to pass to display.update().
+        """
+        rects = []
+        head_sprite, body_sprite = self.skin_sprites()
+        head = self.snake[0]
+        food_cell = self.food[0] if self.food else None
+        background = self.layers.background
+        for x, y in self.dirty_cells:
+            rect = pygame.Rect(x*GRID_SIZE, y*GRID_SIZE+60, GRID_SIZE, GRID_SIZE)
+            # Repaint the cell's piece of the background (border included)
+            self.screen.blit(background, rect, rect)
+            if (x, y) in self.engine.occupied:
+                self.screen.blit(head_sprite if (x, y) == head else body_sprite, rect)
+            elif (x, y) == food_cell:
+                self.draw_food()
+            rects.append(rect)
+        self.dirty_cells.clear()
+
+        if self._hud_key != self.hud_state():
+            self.draw_hud()
+            rects.append(pygame.Rect(0, 0, self.screen_width, 60))
+        elif (self.profiler is not None and
+              time.perf_counter() - self._profiler_updated >= PROFILE_OVERLAY_INTERVAL):
+            rects.append(self.draw_profiler_overlay())
+        return rects
 
     def draw_menu(self):
         self.screen.fill((40, 40, 40))
-        title = self.big_font.render("Snake Game", True, (0, 200, 0))
+        title = render_text(self.big_font, "Snake Game", (0, 200, 0))
         self.screen.blit(title, (self.screen_width // 2 - title.get_width() // 2, 120))
 
         # Buttons
-        start_btn = self.button_font.render("Start", True, (255, 255, 255))
-        exit_btn = self.button_font.render("Exit", True, (200, 0, 0))
+        start_btn = render_text(self.button_font, "Start", (255, 255, 255))
+        exit_btn = render_text(self.button_font, "Exit", (200, 0, 0))
 
         self.start_btn_rect = start_btn.get_rect(center=(self.screen_width // 2, 300))
         self.exit_btn_rect = exit_btn.get_rect(center=(self.screen_width // 2, 360))
@@ -340,7 +1102,7 @@ class SnakeGame:
         self.screen.blit(exit_btn, self.exit_btn_rect)
 
         # Skin selection
-        skin_text = self.font.render("Choose Snake Skin:", True, (255,255,255))
+        skin_text = render_text(self.font, "Choose Snake Skin:", (255,255,255))
         self.screen.blit(skin_text, (self.screen_width // 2 - skin_text.get_width() // 2, 180))
 
         # Build visible skins (skip legendary if locked)
@@ -353,7 +1115,7 @@ class SnakeGame:
             if idx == 4 and not self.legendary_unlocked:
                 continue
             visible_indices.append(idx)
-            btn = self.button_font.render(skin["name"], True, (0,0,0))
+            btn = render_text(self.button_font, skin["name"], (0,0,0))
             rect = btn.get_rect(center=(self.screen_width // 2 - 180 + idx_offset*spacing, 240))
             # selected highlight: invert background
             btn_bg = (200,200,200) if idx == self.skin_idx else skin["head"]
@@ -365,56 +1127,53 @@ class SnakeGame:
             self.skin_btn_rects.append((rect, idx))  # store tuple (rect, actual_skin_index)
             idx_offset += 1
 
-    def draw_gameover(self):
-        self.draw()
-        over_text = self.big_font.render("GAME OVER", True, (255, 255, 255))
-        self.screen.blit(over_text, (self.screen_width // 2 - over_text.get_width() // 2, 120))
-
-        restart_btn = self.button_font.render("Restart", True, (0, 200, 0))
-        menu_btn = self.button_font.render("Menu", True, (0, 150, 200))
-        exit_btn = self.button_font.render("Exit", True, (200, 0, 0))
-
-        self.restart_btn_rect = restart_btn.get_rect(center=(self.screen_width // 2, 300))
-        self.menu_btn_rect = menu_btn.get_rect(center=(self.screen_width // 2, 360))
-        self.exit_btn_rect = exit_btn.get_rect(center=(self.screen_width // 2, 420))
+    def draw_overlay(self, title, buttons):
+        """
+        Board with the overlay layer on top. Both are composed once, when the
+        screen first appears; later frames blit the frozen copy, with a fresh
+        profiler overlay if it is on. Returns the button rects.
+        """
+        overlay, pos, rects = self.layers.overlay(title, buttons, self.big_font, self.button_font)
+        if self.layers.frozen is None or self.layers.frozen_key != title:
+            self.draw()
+            self.screen.blit(overlay, pos)
+            self.layers.freeze(self.screen, title)
+        else:
+            self.screen.blit(self.layers.frozen, (0, 0))
+            if self.profiler is not None:
+                self._profiler_surf = None  # static screens only redraw on wake-ups; always refresh
+                self.draw_profiler_overlay()
+        return rects
 
-        self.screen.blit(restart_btn, self.restart_btn_rect)
-        self.screen.blit(menu_btn, self.menu_btn_rect)
-        self.screen.blit(exit_btn, self.exit_btn_rect)
+    def draw_gameover(self):
+        title = "YOU WIN" if self.state == "win" else "GAME OVER"
+        self.restart_btn_rect, self.menu_btn_rect, self.exit_btn_rect = self.draw_overlay(
+            title, [("Restart", (0, 200, 0)), ("Menu", (0, 150, 200)), ("Exit", (200, 0, 0))])
 
     def draw_pause(self):
-        self.draw()
-        pause_text = self.big_font.render("PAUSED", True, (255, 255, 255))
-        self.screen.blit(pause_text, (self.screen_width // 2 - pause_text.get_width() // 2, 120))
-
-        resume_btn = self.button_font.render("Resume", True, (0, 200, 0))
-        menu_btn = self.button_font.render("Menu", True, (0, 150, 200))
-        exit_btn = self.button_font.render("Exit", True, (200, 0, 0))
-
-        self.resume_btn_rect = resume_btn.get_rect(center=(self.screen_width // 2, 300))
-        self.menu_btn_rect = menu_btn.get_rect(center=(self.screen_width // 2, 360))
-        self.exit_btn_rect = exit_btn.get_rect(center=(self.screen_width // 2, 420))
-
-        self.screen.blit(resume_btn, self.resume_btn_rect)
-        self.screen.blit(menu_btn, self.menu_btn_rect)
-        self.screen.blit(exit_btn, self.exit_btn_rect)
+        self.resume_btn_rect, self.menu_btn_rect, self.exit_btn_rect = self.draw_overlay(
+            "PAUSED", [("Resume", (0, 200, 0)), ("Menu", (0, 150, 200)), ("Exit", (200, 0, 0))])
 
     # --- Persistence ------------------------------------------------------
     def save_highscore(self):
-        try:
-            with open(HIGHSCORE_FILE, "w", encoding="utf-8") as f:
-                json.dump({"highscore": self.highscore}, f)
-        except Exception:
-            pass
+        # Queued; the background writer merges updates and writes atomically
+        STORE.write(HIGHSCORE_FILE, json.dumps({"highscore": self.highscore}))
 
-    def load_highscore(self):
-        if os.path.exists(HIGHSCORE_FILE):
-            try:
-                with open(HIGHSCORE_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f).get("highscore", 0)
-            except Exception:
-                return 0
-        return 0
+    def save_snapshot(self):
+        """Queue a snapshot of the running game; autopilot (attract mode) games are not saved."""
+        self.last_autosave = time.perf_counter()
+        if self.autopilot is not None or self.recorder is None:
+            return
+        # Only copies here; the writer thread packs it (see snapshot.py)
+        STORE.write(SNAPSHOT_FILE, self.take_snapshot().to_bytes)
+        self.saved_snapshot = True
+
+    def autosave(self):
+        """The periodic snapshot while playing; skipped while the copy would be a visible hitch."""
+        if self.recorder is not None and len(self.snake) + len(self.recorder.replay.events) > AUTOSAVE_MAX_COPY:
+            self.last_autosave = time.perf_counter()
+            return
+        self.save_snapshot()
 
     def check_achievements(self, score):
         unlocked = set(self.achievements)
@@ -427,31 +1186,88 @@ class SnakeGame:
 
     # --- Gameplay helpers -----------------------------------------------
     def create_food(self):
-        while True:
-            x = random.randint(0, self.grid_width-1)
-            y = random.randint(0, self.grid_height-1)
-            if not hasattr(self, "snake") or (x, y) not in self.snake:
-                emoji = random.choice(FOODS)
-                return ((x, y), emoji)
+        # O(1) pick from the engine's free-cell index; None means the board is full
+        cell = self.engine.spawn_food(self.rng)
+        if cell is None:
+            return None
+        return (cell, self.rng.choice(FOODS))
 
     # --- Main loop -------------------------------------------------------
-    def run(self):
-        self.start_game()
+    def run(self, snapshot=None):
+        """Play until the player returns to the menu; snapshot (see load_snapshot) continues a saved game."""
+        # Only the events handled below reach the queue (no motion/text floods)
+        pygame.event.set_allowed(None)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(GAME_EVENTS)
+        if self.capture_format and self.capture is None:
+            self.toggle_capture()
+        try:
+            self._run(snapshot)
+        finally:
+            if self.capture is not None:
+                self.toggle_capture()
+            if pygame.get_init():  # not after exit_game()
+                pygame.event.set_allowed(None)  # menu.py's loops see everything again
+
+    def _run(self, snapshot=None):
+        if snapshot is not None:
+            try:
+                self.restore_snapshot(snapshot)
+            except ValueError as e:
+                # Saved on a different board size (e.g. another resolution)
+                print(f"Cannot continue the saved game: {e}", file=sys.stderr)
+                snapshot = None
+        if snapshot is None:
+            self.start_game()
+        keys = {pygame.K_UP: "UP", pygame.K_DOWN: "DOWN", pygame.K_LEFT: "LEFT", pygame.K_RIGHT: "RIGHT"}
+        last_poll = time.perf_counter()
         while True:
-            self.clock.tick(100)
-            for event in pygame.event.get():
+            prof = self.profiler
+            if self.state == "game":
+                self.clock.tick(self.render_fps)
+                if prof:
+                    prof.begin_frame()
+                events = pygame.event.get()
+                # pygame events carry no timestamp: a key press arrived at some point
+                # since the previous poll, so latency is measured from the midpoint
+                now = time.perf_counter()
+                polled_at = (last_poll + now) / 2
+                last_poll = now
+            else:
+                # Static screens are already presented: sleep until something happens
+                # (waking up for the profiler overlay's refreshes while it is on)
+                if self.autopilot is not None and self.state in ("gameover", "win"):
+                    wait = self.finished_at + ATTRACT_RESTART_DELAY - time.perf_counter()
+                    if wait <= 0:
+                        self.restart_game()
+                        continue
+                    if prof:
+                        wait = min(wait, PROFILE_OVERLAY_INTERVAL)
+                    events = [pygame.event.wait(max(1, int(wait * 1000)))]
+                elif prof:
+                    events = [pygame.event.wait(int(PROFILE_OVERLAY_INTERVAL * 1000))]
+                else:
+                    events = [pygame.event.wait()]
+                if prof:
+                    prof.begin_frame()
+                events += pygame.event.get()
+                self.reset_tick_clock()
+                last_poll = polled_at = time.perf_counter()
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.exit_game()
                 elif event.type == pygame.KEYDOWN:
-                    if self.state == "game":
-                        if event.key == pygame.K_UP:
-                            self.change_direction("UP")
-                        elif event.key == pygame.K_DOWN:
-                            self.change_direction("DOWN")
-                        elif event.key == pygame.K_LEFT:
-                            self.change_direction("LEFT")
-                        elif event.key == pygame.K_RIGHT:
-                            self.change_direction("RIGHT")
+                    if event.key == pygame.K_F3:
+                        self.toggle_profiler()
+                    elif event.key == pygame.K_F4:
+                        self.export_profile()
+                    elif event.key == pygame.K_F2:
+                        self.toggle_autopilot()
+                    elif event.key == pygame.K_F6:
+                        self.toggle_capture()
+                    elif self.state == "game":
+                        if event.key in keys:
+                            self.change_direction(keys[event.key], polled_at)
                         elif event.key == pygame.K_ESCAPE:
                             self.pause_game()
                     elif self.state == "pause":
@@ -468,7 +1284,7 @@ class SnakeGame:
                             self.start_game()
                         elif self.exit_btn_rect and self.exit_btn_rect.collidepoint(mx, my):
                             self.exit_game()
-                    elif self.state == "gameover":
+                    elif self.state in ("gameover", "win"):
                         if self.restart_btn_rect and self.restart_btn_rect.collidepoint(mx, my):
                             self.restart_game()
                         elif self.menu_btn_rect and self.menu_btn_rect.collidepoint(mx, my):
@@ -483,28 +1299,58 @@ class SnakeGame:
                         elif self.exit_btn_rect and self.exit_btn_rect.collidepoint(mx, my):
                             self.exit_game()
 
-            # State updates + drawing
+            if prof:
+                prof.mark("events")
+
+            # State updates
+            if self.state == "game":
+                self.advance_simulation()
+                if self.state == "game" and time.perf_counter() - self.last_autosave >= AUTOSAVE_INTERVAL:
+                    self.autosave()
+                if prof:
+                    prof.mark("move")
+
+            # Drawing
+            dirty_rects = None  # None -> full flip
             if self.state == "menu":
                 self.draw_menu()
             elif self.state == "game":
-                now = time.time()
-                move_interval = 1.0 / self.speed
-                if now - getattr(self, "last_move_time", 0) >= move_interval:
-                    self.move()
-                    self.last_move_time = now
-                self.draw()
-            elif self.state == "gameover":
+                if (self.incremental and not self.needs_full_redraw and not self.legendary_active
+                        and self.viewport is None):
+                    dirty_rects = self.draw_dirty()
+                else:
+                    self.draw()
+            elif self.state in ("gameover", "win"):
                 self.draw_gameover()
             elif self.state == "pause":
                 self.draw_pause()
+            if prof:
+                prof.mark("draw")
 
-            pygame.display.flip()
+            if dirty_rects is None:
+                # Overlays replace the board; the next game frame must be complete
+                if self.state != "game":
+                    self.needs_full_redraw = True
+                pygame.display.flip()
+            elif dirty_rects:
+                pygame.display.update(dirty_rects)
+            self.input_latency.presented()
+            if prof:
+                prof.mark("flip")
+            if self.capture is not None:
+                self.capture.capture(self.screen)
+                if prof:
+                    prof.mark("capture")
+            if prof:
+                prof.end_frame()
 
 
 # If run directly, allow testing the game by itself (fullscreen)
 if __name__ == "__main__":
     pygame.init()
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    # --resolution=WxH draws at that logical resolution, scaled to the panel
+    # --vsync paces frames by the panel's refresh instead of the RENDER_FPS cap
+    screen = open_display(size_arg(sys.argv[1:], "--resolution"), vsync="--vsync" in sys.argv[1:])
     try:
         pygame.mixer.init()
         if os.path.exists("music1.mp3"):
@@ -513,4 +1359,10 @@ if __name__ == "__main__":
             pygame.mixer.music.play(-1)
     except Exception:
         pass
-    SnakeGame(screen).run()
+    # --board=WxH plays on a board of that size with a scrolling camera
+    board_size = size_arg(sys.argv[1:], "--board")
+    # --capture records gameplay (--capture=raw for a raw video stream, else PNG frames)
+    capture = next((arg.partition("=")[2] or "png" for arg in sys.argv[1:]
+                    if arg.split("=", 1)[0] == "--capture"), None)
+    SnakeGame(screen, autopilot="--autopilot" in sys.argv[1:], board_size=board_size,
+              capture=capture).run()
@@ -1,10 +1,18 @@
+from startup import STARTUP  # first, so --startup-timing covers the imports below
 import pygame
 import sys
-from game import SnakeGame, SKINS, ACHIEVEMENT_THRESHOLDS, load_achievements
-import pygame_emojis
+import threading
+from game import (SnakeGame, GameSession, SKINS, ACHIEVEMENT_THRESHOLDS, load_achievements,
+                  render_text, open_score_store, prefetch_assets, build_assets, open_display, size_arg,
+                  load_snapshot)
+from scores import ScoreStore, today
+from fonts import get_font
+STARTUP.mark("imports")
 
-pygame.init()
-pygame.mixer.init()
+# Only what the first menu frame needs; the mixer is opened by the music loader thread
+pygame.display.init()
+pygame.font.init()
+STARTUP.mark("pygame init")
 
 # Colors
 BG_COLOR = (30, 30, 30)
@@ -14,30 +22,75 @@ TEXT_COLOR = (255, 255, 255)
 EXIT_COLOR = (220, 50, 50)
 EXIT_HOVER = (255, 80, 80)
 
-# Fonts
-TITLE_FONT = pygame.font.SysFont("Segoe UI Emoji", 72)
-BUTTON_FONT = pygame.font.SysFont("Segoe UI Emoji", 48)
+# Fonts (paths cached on disk after the first run, see fonts.py)
+TITLE_FONT = get_font("Segoe UI Emoji", 72)
+BUTTON_FONT = get_font("Segoe UI Emoji", 48)
+LIST_FONT = get_font("Segoe UI Emoji", 32)
+STARTUP.mark("fonts")
 
-# Music control
+LEADERBOARD_PAGE_SIZE = 10
+MENU_FPS = 60           # redraw cap while input (e.g. mouse motion) keeps arriving
+MENU_IDLE_WAIT = 500    # ms; an idle menu still redraws this often
+
+# Music control (loaded in the background by start_background_loading)
 music_on = True
-try:
-    pygame.mixer.music.load("music1.mp3")
-    pygame.mixer.music.set_volume(0.5)
-    pygame.mixer.music.play(-1)
-except Exception as e:
-    print("Zene betöltése sikertelen:", e)
-    music_on = False
+music_ready = False
+# Set once the loader thread has the game's font files; the menu then builds the fonts
+assets_prefetched = threading.Event()
+
+
+def _load_music():
+    global music_on, music_ready
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.music.load("music1.mp3")
+        pygame.mixer.music.set_volume(0.5)
+        music_ready = True
+        if music_on:
+            pygame.mixer.music.play(-1)
+        STARTUP.mark("music loaded")
+    except Exception as e:
+        print("Zene betöltése sikertelen:", e)
+        music_on = False
+
+
+def _load_game_assets():
+    try:
+        prefetch_assets()
+        STARTUP.mark("game fonts prefetched")
+    except Exception as e:
+        print("Asset preload failed:", e, file=sys.stderr)
+    assets_prefetched.set()
+
+
+def start_background_loading():
+    """Load music and the game's font files while the menu is already showing."""
+    threading.Thread(target=_load_music, name="music-loader", daemon=True).start()
+    threading.Thread(target=_load_game_assets, name="asset-loader", daemon=True).start()
+
+
+def menu_events(clock, busy=False):
+    """
+    Events for the next menu frame. The menus only change on input, so this
+    sleeps until an event arrives instead of redrawing flat out; busy=True
+    (work to step every frame) only caps the frame rate.
+    """
+    clock.tick(MENU_FPS)
+    if busy:
+        return pygame.event.get()
+    return [pygame.event.wait(MENU_IDLE_WAIT)] + pygame.event.get()
 
 
 def draw_text(surface, text, font, color, center):
-    text_surf = font.render(text, True, color)
+    text_surf = render_text(font, text, color)
     rect = text_surf.get_rect(center=center)
     surface.blit(text_surf, rect)
     return rect
 
 
 def draw_button(surface, text, font, color, hover_color, center, mouse_pos):
-    text_surf = font.render(text, True, TEXT_COLOR)
+    text_surf = render_text(font, text, TEXT_COLOR)
     rect = text_surf.get_rect(center=center)
     button_rect = pygame.Rect(rect.left - 30, rect.top - 20, rect.width + 60, rect.height + 40)
     is_hover = button_rect.collidepoint(mouse_pos)
@@ -47,7 +100,9 @@ def draw_button(surface, text, font, color, hover_color, center, mouse_pos):
 
 
 def show_achievements(screen):
-    achievements = load_achievements()
+    store = open_score_store()
+    achievements = store.achievements() if store is not None else load_achievements()
+    clock = pygame.time.Clock()
     running = True
     while running:
         mouse_pos = pygame.mouse.get_pos()
@@ -67,23 +122,91 @@ def show_achievements(screen):
             screen, "Back", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
             (screen.get_width() // 2, y + 40), mouse_pos
         )
+        pygame.display.flip()
 
-        for event in pygame.event.get():
+        for event in menu_events(clock):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if back_rect.collidepoint(event.pos):
                     running = False
+
+
+def show_leaderboard(screen):
+    store = open_score_store()
+    filters = [("All", {})] + [(skin["name"], {"skin": skin["name"]}) for skin in SKINS] + [("Today", {"day": today()})]
+    filter_idx = 0
+    cursors = [None]  # keyset cursor of every page visited so far
+    rows = None
+    has_more = False
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        if rows is None:
+            # Query only when the page or filter changes, one page (+1 to detect more)
+            rows = []
+            if store is not None:
+                rows = store.leaderboard(LEADERBOARD_PAGE_SIZE + 1, after=cursors[-1], **filters[filter_idx][1])
+            has_more = len(rows) > LEADERBOARD_PAGE_SIZE
+            rows = rows[:LEADERBOARD_PAGE_SIZE]
+
+        mouse_pos = pygame.mouse.get_pos()
+        screen.fill(BG_COLOR)
+        cx = screen.get_width() // 2
+        draw_text(screen, "Leaderboard", TITLE_FONT, BUTTON_COLOR, (cx, 120))
+        filter_rect = draw_button(screen, f"Filter: {filters[filter_idx][0]}", LIST_FONT,
+                                  BUTTON_COLOR, BUTTON_HOVER, (cx, 210), mouse_pos)
+        y = 280
+        # Rows close up on short (e.g. 720p logical) screens so Back stays visible
+        row_height = min(45, (screen.get_height() - 380) // LEADERBOARD_PAGE_SIZE)
+        first_rank = (len(cursors) - 1) * LEADERBOARD_PAGE_SIZE + 1
+        for rank, row in enumerate(rows, first_rank):
+            text = f"{rank}.  {row['score']} points   {row['skin']}   {row['day']}"
+            draw_text(screen, text, LIST_FONT, TEXT_COLOR, (cx, y))
+            y += row_height
+        if not rows:
+            draw_text(screen, "No games yet", LIST_FONT, (120, 120, 120), (cx, y))
+        y = 280 + LEADERBOARD_PAGE_SIZE * row_height + 40
+
+        prev_rect = draw_button(screen, "Prev", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
+                                (cx - 250, y), mouse_pos) if len(cursors) > 1 else None
+        back_rect = draw_button(screen, "Back", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER, (cx, y), mouse_pos)
+        next_rect = draw_button(screen, "Next", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
+                                (cx + 250, y), mouse_pos) if has_more else None
         pygame.display.flip()
 
+        for event in menu_events(clock):
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if back_rect.collidepoint(event.pos):
+                    running = False
+                elif filter_rect.collidepoint(event.pos):
+                    filter_idx = (filter_idx + 1) % len(filters)
+                    cursors = [None]
+                    rows = None
+                elif next_rect and next_rect.collidepoint(event.pos):
+                    cursors.append(ScoreStore.page_cursor(rows))
+                    rows = None
+                elif prev_rect and prev_rect.collidepoint(event.pos):
+                    cursors.pop()
+                    rows = None
+
 
 def show_menu(screen):
     global music_on
     running = True
     selected_skin = 0
     skin_btn_rects = []
-    button_spacing = 100
+    # One session and one game for the whole process: Start only resets the board
+    game = None
+    # A game left from the pause screen or by quitting; offered as Continue
+    saved = load_snapshot()
+    # The game's fonts and food atlas, built one piece per menu frame
+    asset_steps = build_assets()
+    clock = pygame.time.Clock()
 
     while running:
         mouse_pos = pygame.mouse.get_pos()
@@ -97,7 +220,7 @@ def show_menu(screen):
         start_x = screen.get_width() // 2 - total_width // 2
         x = start_x
         for idx, skin in enumerate(SKINS):
-            name_surf = BUTTON_FONT.render(skin["name"], True, (0, 0, 0) if idx != selected_skin else skin["head"])
+            name_surf = render_text(BUTTON_FONT, skin["name"], (0, 0, 0) if idx != selected_skin else skin["head"])
             btn_width = name_surf.get_width() + 40
             btn_height = name_surf.get_height() + 20
             btn_rect = pygame.Rect(x, screen.get_height() // 2 - 60, btn_width, btn_height)
@@ -109,20 +232,34 @@ def show_menu(screen):
 
         # --- Buttons ---
         start_y = screen.get_height() // 2 + 60
-        start_rect = draw_button(screen, "Start", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
-                                 (screen.get_width() // 2, start_y), mouse_pos)
-        achievements_rect = draw_button(screen, "Achievements", BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
-                                        (screen.get_width() // 2, start_y + button_spacing), mouse_pos)
+        labels = (["Continue"] if saved is not None else []) + ["Start", "Achievements", "Leaderboard"]
+        # Tighter on short (e.g. 720p logical) screens so Exit stays visible
+        button_spacing = min(100, (screen.get_height() - 60 - start_y) // len(labels))
+        buttons = {label: draw_button(screen, label, BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
+                                      (screen.get_width() // 2, start_y + i * button_spacing), mouse_pos)
+                   for i, label in enumerate(labels)}
         exit_rect = draw_button(screen, "Exit", BUTTON_FONT, EXIT_COLOR, EXIT_HOVER,
-                                (screen.get_width() // 2, start_y + 2 * button_spacing), mouse_pos)
+                                (screen.get_width() // 2, start_y + len(labels) * button_spacing), mouse_pos)
 
         # --- Music toggle (jobb felső sarok) ---
         music_rect = draw_button(screen, f"Music: {'On' if music_on else 'Off'}",
                                  BUTTON_FONT, BUTTON_COLOR, BUTTON_HOVER,
                                  (screen.get_width() - 150, 50), mouse_pos)
 
-        # --- Events ---
-        for event in pygame.event.get():
+        pygame.display.flip()
+        STARTUP.first_frame()
+        if asset_steps is not None and assets_prefetched.is_set():
+            try:
+                next(asset_steps)
+            except StopIteration:
+                asset_steps = None
+                STARTUP.mark("game assets built")
+            except Exception as e:
+                print("Asset preload failed:", e, file=sys.stderr)
+                asset_steps = None
+
+        # --- Events --- (polled while assets still build, one step per frame)
+        for event in menu_events(clock, busy=asset_steps is not None):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -130,25 +267,37 @@ def show_menu(screen):
                 for idx, rect in enumerate(skin_btn_rects):
                     if rect.collidepoint(event.pos):
                         selected_skin = idx
-                if start_rect.collidepoint(event.pos):
-                    SnakeGame(screen, skin_idx=selected_skin).run()
+                clicked = next((label for label, rect in buttons.items() if rect.collidepoint(event.pos)), None)
+                if clicked in ("Start", "Continue"):
+                    if game is None:
+                        session = GameSession(screen, start_music=False)  # music is ours
+                        game = SnakeGame(screen, skin_idx=selected_skin, session=session)
+                    game.skin_idx = selected_skin
+                    game.run(saved if clicked == "Continue" else None)
+                    saved = load_snapshot()
                     running = True
-                elif achievements_rect.collidepoint(event.pos):
+                elif clicked == "Achievements":
                     show_achievements(screen)
+                elif clicked == "Leaderboard":
+                    show_leaderboard(screen)
                 elif exit_rect.collidepoint(event.pos):
                     pygame.quit()
                     sys.exit()
                 elif music_rect.collidepoint(event.pos):
                     music_on = not music_on
-                    if music_on:
-                        pygame.mixer.music.play(-1)
-                    else:
-                        pygame.mixer.music.stop()
-
-        pygame.display.flip()
+                    if music_ready:
+                        if music_on:
+                            pygame.mixer.music.play(-1)
+                        else:
+                            pygame.mixer.music.stop()
 
 
 if __name__ == "__main__":
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    STARTUP.enabled = "--startup-timing" in sys.argv[1:]
+    # --resolution=WxH (e.g. 1280x720) renders at that size and scales to the panel;
+    # --vsync paces the game by the panel's refresh
+    screen = open_display(size_arg(sys.argv[1:], "--resolution"), vsync="--vsync" in sys.argv[1:])
     pygame.display.set_caption("Snake Game Menu")
+    STARTUP.mark("display")
+    start_background_loading()
     show_menu(screen)
@@ -0,0 +1,283 @@
+# netclient.py
+"""
+Multiplayer client for server.py.
+
+Connection speaks the protocol and keeps a BoardMirror of the room. Bot is
+a headless greedy client, used by `server.py --selftest` and for load
+tests against a real server. NetClientGame is the pygame client: it uses
+SnakeGame's screen, fonts and food sprites, and runs the network side on
+a background thread with its own event loop.
+
+    python netclient.py localhost:7777 --room main --name alice
+    python netclient.py localhost:7777 --room main --bots 4     # headless bots
+"""
+import argparse
+import asyncio
+import random
+import sys
+import threading
+
+import netproto
+from engine import DIRECTIONS, FOODS
+from netproto import BoardMirror, DIRECTION_CODES, MSG_DELTA, MSG_INPUT, MSG_WELCOME
+
+
+class Connection:
+    def __init__(self, room, name):
+        self.room = room
+        self.name = name
+        self.player_id = None
+        self.tick_rate = None
+        self.mirror = None
+        self.reader = None
+        self.writer = None
+        self.frames = 0
+        self.bytes_received = 0
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(netproto.hello(self.room, self.name))
+        try:
+            msg_type, payload = await netproto.read_frame(self.reader)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError(f"server closed the connection (room {self.room!r} full?)") from None
+        if msg_type != MSG_WELCOME:
+            raise netproto.ProtocolError(f"expected WELCOME, got message type {msg_type}")
+        self.player_id, grid_width, grid_height, self.tick_rate = netproto.WELCOME.unpack(payload)
+        self.mirror = BoardMirror(grid_width, grid_height)
+        return self
+
+    def send_direction(self, direction):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(netproto.frame(MSG_INPUT, bytes([DIRECTION_CODES[direction]])))
+
+    async def receive(self, on_frame=None):
+        """
+        Read frames until the server closes the connection. Each one is
+        applied to the mirror, or handed to on_frame(type, payload) if given.
+        """
+        try:
+            while True:
+                msg_type, payload = await netproto.read_frame(self.reader)
+                self.frames += 1
+                self.bytes_received += netproto.FRAME.size + len(payload)
+                if on_frame is None:
+                    self.mirror.apply(msg_type, payload)
+                else:
+                    on_frame(msg_type, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def heading(self):
+        """Direction the own snake last moved in, or None if it is not on the board."""
+        body = self.mirror.snakes.get(self.player_id)
+        if not body or len(body) < 2:
+            return None
+        (hx, hy), (nx, ny) = self.mirror.cell(body[0]), self.mirror.cell(body[1])
+        for name, d in DIRECTIONS.items():
+            if d == (hx - nx, hy - ny):
+                return name
+        return None
+
+
+# --- Headless bot --------------------------------------------------------
+class Bot(Connection):
+    """Moves to the free neighbour nearest to any food after every tick."""
+
+    def __init__(self, room, name, seed=None):
+        super().__init__(room, name)
+        self.rng = random.Random(seed)
+
+    def choose(self):
+        mirror = self.mirror
+        body = mirror.snakes.get(self.player_id)
+        if not body:
+            return None
+        w, h = mirror.grid_width, mirror.grid_height
+        hx, hy = mirror.cell(body[0])
+        foods = [mirror.cell(c) for c in mirror.foods]
+        best = None
+        for name, (dx, dy) in DIRECTIONS.items():
+            x, y = hx + dx, hy + dy
+            if not (0 <= x < w and 0 <= y < h) or y * w + x in mirror.occupied:
+                continue
+            dist = min((abs(x - fx) + abs(y - fy) for fx, fy in foods), default=0)
+            key = (dist, self.rng.random())
+            if best is None or key < best[0]:
+                best = (key, name)
+        return best[1] if best else None
+
+    def on_frame(self, msg_type, payload):
+        self.mirror.apply(msg_type, payload)
+        if msg_type == MSG_DELTA:
+            direction = self.choose()
+            if direction is not None and direction != self.heading():
+                self.send_direction(direction)
+
+    async def run(self, host, port, stop):
+        """Play until `stop` (an asyncio.Event) is set or the server goes away."""
+        await self.connect(host, port)
+        receiving = asyncio.create_task(self.receive(self.on_frame))
+        stopping = asyncio.create_task(stop.wait())
+        await asyncio.wait([receiving, stopping], return_when=asyncio.FIRST_COMPLETED)
+        receiving.cancel()
+        stopping.cancel()
+        self.close()
+
+
+# --- Pygame client -------------------------------------------------------
+def _game_class():
+    # game.py pulls in pygame; only the windowed client needs it
+    import pygame
+    from game import SnakeGame, SKINS, GRID_SIZE, build_skin_sprites, render_text
+
+    class NetClientGame(SnakeGame):
+        """A window on one room of a server; arrow keys steer, Esc leaves."""
+
+        def __init__(self, screen, host, port, room="main", name="player", skin_idx=0):
+            super().__init__(screen, skin_idx=min(skin_idx, 3))
+            self.connection = Connection(room, name)
+            self.lock = threading.Lock()  # guards the mirror between the two threads
+            self.board_changed = True
+            self.error = None
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self.thread = threading.Thread(target=self._network, args=(host, port, ready), daemon=True)
+            self.thread.start()
+            ready.wait()
+            if self.error is not None:
+                raise self.error
+            mirror = self.connection.mirror
+            self.cell_size = max(4, min(GRID_SIZE, self.screen_width // mirror.grid_width,
+                                        (self.screen_height - 60) // mirror.grid_height))
+            self.player_sprites = [build_skin_sprites(skin, self.cell_size) for skin in SKINS[:4]]
+
+        # --- Network thread ---
+        def _network(self, host, port, ready):
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self.connection.connect(host, port))
+            except (OSError, netproto.ProtocolError) as e:
+                self.error = e
+                ready.set()
+                return
+            ready.set()
+            self.loop.run_until_complete(self.connection.receive(self._on_frame))
+            self.connection.close()
+
+        def _on_frame(self, msg_type, payload):
+            with self.lock:
+                self.connection.mirror.apply(msg_type, payload)
+                self.board_changed = True
+
+        def send_direction(self, direction):
+            self.loop.call_soon_threadsafe(self.connection.send_direction, direction)
+
+        # --- Drawing ---
+        def draw(self):
+            with self.lock:
+                mirror = self.connection.mirror
+                snakes = [(pid, [mirror.cell(c) for c in body]) for pid, body in mirror.snakes.items()]
+                foods = [(mirror.cell(c), kind) for c, kind in mirror.foods.items()]
+                score = mirror.scores.get(self.connection.player_id, 0)
+                self.board_changed = False
+            size = self.cell_size
+            self.screen.fill((40, 40, 40))
+            pygame.draw.rect(self.screen, (200, 200, 200),
+                             (0, 60, mirror.grid_width * size, mirror.grid_height * size), 2)
+            for pid, cells in snakes:
+                if pid == self.connection.player_id:
+                    head, body = self.player_sprites[self.skin_idx]
+                else:
+                    # Other players cycle through the remaining standard skins
+                    others = [s for i, s in enumerate(self.player_sprites) if i != self.skin_idx]
+                    head, body = others[pid % len(others)]
+                blits = [(body, (x*size, y*size+60)) for x, y in cells]
+                if blits:
+                    blits[0] = (head, blits[0][1])
+                self.screen.blits(blits, doreturn=False)
+            for (fx, fy), kind in foods:
+                try:
+                    self.screen.blit(self.emoji_cache.get(FOODS[kind], size), (fx*size, fy*size+60))
+                except Exception:
+                    pygame.draw.circle(self.screen, (255, 120, 120),
+                                       (fx*size + size//2, fy*size + 60 + size//2), size//2 - 2)
+
+            pygame.draw.rect(self.screen, (30, 30, 30), (0, 0, self.screen_width, 60))
+            status = "" if self.thread.is_alive() else "    DISCONNECTED (Esc)"
+            text = (f"Score: {score}    Players: {len(snakes)}    "
+                    f"Room: {self.connection.room}{status}")
+            self.screen.blit(render_text(self.font, text, (255, 255, 255)), (20, 20))
+            pygame.display.flip()
+
+        def run(self):
+            keys = {pygame.K_UP: "UP", pygame.K_DOWN: "DOWN",
+                    pygame.K_LEFT: "LEFT", pygame.K_RIGHT: "RIGHT"}
+            try:
+                while True:
+                    self.clock.tick(self.render_fps)
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            self.exit_game()
+                        elif event.type == pygame.KEYDOWN:
+                            if event.key in keys:
+                                self.send_direction(keys[event.key])
+                            elif event.key == pygame.K_ESCAPE:
+                                return
+                    # Only redraw once a new tick has arrived
+                    if self.board_changed or not self.thread.is_alive():
+                        self.draw()
+            finally:
+                self.loop.call_soon_threadsafe(self.connection.close)
+
+    return NetClientGame
+
+
+def _parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "localhost", int(port)
+
+
+async def _run_bots(host, port, room, count):
+    stop = asyncio.Event()
+    bots = [Bot(room, f"bot{i}", seed=i) for i in range(count)]
+    try:
+        await asyncio.gather(*(bot.run(host, port, stop) for bot in bots))
+    finally:
+        stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snake multiplayer client")
+    parser.add_argument("address", nargs="?", default="localhost:7777", help="host:port")
+    parser.add_argument("--room", default="main")
+    parser.add_argument("--name", default="player")
+    parser.add_argument("--skin", type=int, default=0)
+    parser.add_argument("--bots", type=int, default=0, help="run this many headless bots instead")
+    args = parser.parse_args(argv)
+    host, port = _parse_address(args.address)
+
+    if args.bots:
+        try:
+            asyncio.run(_run_bots(host, port, args.room, args.bots))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    import pygame
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 860))
+    try:
+        _game_class()(screen, host, port, args.room, args.name, args.skin).run()
+    except (OSError, netproto.ProtocolError) as e:
+        print(f"cannot join {args.address}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
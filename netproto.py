@@ -0,0 +1,253 @@
+# netproto.py
+"""
+Binary protocol for networked multiplayer (server.py / netclient.py).
+
+Every message is a frame:  length u16 | type u8 | payload (length bytes),
+little endian. Cells travel as u16 flat indices (y * grid_width + x), so a
+board may have at most 65536 cells. A SNAPSHOT of a full board must also fit
+one frame, which limits rooms further (see max_snapshot_payload).
+
+    HELLO     C->S  room str8 | name str8
+    WELCOME   S->C  player u8 | grid_w u16 | grid_h u16 | tick_rate f32
+    INPUT     C->S  direction u8 (UP=0, DOWN=1, LEFT=2, RIGHT=3)
+    SNAPSHOT  S->C  tick u32 | snakes u8 { id u8 | score u16 | length u16 | cells u16 * length }
+                    | foods u16 { cell u16 | kind u8 }
+    DELTA     S->C  tick u32 | ops...
+
+A tick only sends what changed: DELTA ops are
+
+    HEAD  id u8 | cell u16        new head
+    TAIL  id u8                   tail removed (the client knows which cell)
+    FOOD  cell u16 | kind u8      food appeared
+    EAT   cell u16                food gone
+    SPAWN id u8 | length u8 | cells u16 * length   snake (re)appears, head first
+    DIE   id u8                   snake removed
+    SCORE id u8 | score u16
+
+BoardMirror applies SNAPSHOT/DELTA payloads to rebuild the board.
+"""
+import struct
+from collections import deque
+
+MSG_HELLO = 1
+MSG_WELCOME = 2
+MSG_INPUT = 3
+MSG_SNAPSHOT = 4
+MSG_DELTA = 5
+
+OP_HEAD = 1
+OP_TAIL = 2
+OP_FOOD = 3
+OP_EAT = 4
+OP_SPAWN = 5
+OP_DIE = 6
+OP_SCORE = 7
+
+MAX_CELLS = 1 << 16
+MAX_PAYLOAD = 0xFFFF
+MAX_PLAYER_IDS = 256   # player ids are u8
+DIRECTION_CODES = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+CODE_DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+FRAME = struct.Struct("<HB")
+WELCOME = struct.Struct("<BHHf")
+TICK = struct.Struct("<I")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_ID_CELL = struct.Struct("<BH")
+_CELL_KIND = struct.Struct("<HB")
+_ID_U16 = struct.Struct("<BH")
+_SNAKE = struct.Struct("<BHH")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# --- Framing -----------------------------------------------------------
+def frame(msg_type, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"payload too large ({len(payload)} bytes)")
+    return FRAME.pack(len(payload), msg_type) + payload
+
+
+async def read_frame(reader):
+    """(type, payload) from an asyncio StreamReader; raises IncompleteReadError on EOF."""
+    length, msg_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return msg_type, await reader.readexactly(length)
+
+
+def pack_str(text):
+    data = text.encode("utf-8")[:255]
+    return _U8.pack(len(data)) + data
+
+
+def unpack_str(data, pos):
+    if pos >= len(data) or pos + 1 + data[pos] > len(data):
+        raise ProtocolError("truncated string")
+    n = data[pos]
+    return data[pos + 1:pos + 1 + n].decode("utf-8", "replace"), pos + 1 + n
+
+
+def hello(room, name):
+    return frame(MSG_HELLO, pack_str(room) + pack_str(name))
+
+
+def parse_hello(payload):
+    """(room, name); raises ProtocolError if the payload is malformed."""
+    room, pos = unpack_str(payload, 0)
+    name, pos = unpack_str(payload, pos)
+    if pos != len(payload):
+        raise ProtocolError("trailing bytes after HELLO")
+    return room, name
+
+
+# --- Delta builder -----------------------------------------------------
+class DeltaWriter:
+    """Collects one tick's ops; frame() encodes them once for every client."""
+
+    def __init__(self):
+        self.ops = bytearray()
+
+    def head(self, player_id, cell):
+        self.ops += _U8.pack(OP_HEAD) + _ID_CELL.pack(player_id, cell)
+
+    def tail(self, player_id):
+        self.ops += _U8.pack(OP_TAIL) + _U8.pack(player_id)
+
+    def food(self, cell, kind):
+        self.ops += _U8.pack(OP_FOOD) + _CELL_KIND.pack(cell, kind)
+
+    def eat(self, cell):
+        self.ops += _U8.pack(OP_EAT) + _U16.pack(cell)
+
+    def spawn(self, player_id, cells):
+        self.ops += _U8.pack(OP_SPAWN) + struct.pack(f"<BB{len(cells)}H", player_id, len(cells), *cells)
+
+    def die(self, player_id):
+        self.ops += _U8.pack(OP_DIE) + _U8.pack(player_id)
+
+    def score(self, player_id, score):
+        self.ops += _U8.pack(OP_SCORE) + _ID_U16.pack(player_id, min(score, 0xFFFF))
+
+    def frame(self, tick):
+        return frame(MSG_DELTA, TICK.pack(tick) + self.ops)
+
+    def clear(self):
+        self.ops.clear()
+
+
+def max_snapshot_payload(cells, players):
+    """Upper bound of a SNAPSHOT payload: every cell a segment, one food per player."""
+    return (TICK.size + _U8.size + players * _SNAKE.size + cells * _U16.size
+            + _U16.size + max(1, players) * _CELL_KIND.size)
+
+
+def snapshot(tick, snakes, foods):
+    """snakes: [(id, score, cells head first)], foods: {cell: kind}."""
+    out = bytearray(TICK.pack(tick))
+    out += _U8.pack(len(snakes))
+    for player_id, score, cells in snakes:
+        out += _SNAKE.pack(player_id, min(score, 0xFFFF), len(cells))
+        out += struct.pack(f"<{len(cells)}H", *cells)
+    out += _U16.pack(len(foods))
+    for cell, kind in foods.items():
+        out += _CELL_KIND.pack(cell, kind)
+    return frame(MSG_SNAPSHOT, bytes(out))
+
+
+# --- Client-side board -------------------------------------------------
+class BoardMirror:
+    """The board as a client sees it, rebuilt from SNAPSHOT and DELTA payloads."""
+
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.tick = 0
+        self.snakes = {}   # id -> deque of flat cells, head first
+        self.scores = {}
+        self.foods = {}    # flat cell -> food kind
+        self.occupied = {}  # flat cell -> id
+
+    def cell(self, flat):
+        return flat % self.grid_width, flat // self.grid_width
+
+    def apply(self, msg_type, payload):
+        if msg_type == MSG_SNAPSHOT:
+            self.apply_snapshot(payload)
+        elif msg_type == MSG_DELTA:
+            self.apply_delta(payload)
+
+    def apply_snapshot(self, data):
+        self.tick, = TICK.unpack_from(data, 0)
+        pos = TICK.size
+        self.snakes.clear()
+        self.scores.clear()
+        self.foods.clear()
+        self.occupied.clear()
+        count = data[pos]
+        pos += 1
+        for _ in range(count):
+            player_id, score, length = _SNAKE.unpack_from(data, pos)
+            pos += _SNAKE.size
+            cells = struct.unpack_from(f"<{length}H", data, pos)
+            pos += 2 * length
+            self._add_snake(player_id, cells)
+            self.scores[player_id] = score
+        count, = _U16.unpack_from(data, pos)
+        pos += _U16.size
+        for _ in range(count):
+            cell, kind = _CELL_KIND.unpack_from(data, pos)
+            pos += _CELL_KIND.size
+            self.foods[cell] = kind
+
+    def apply_delta(self, data):
+        self.tick, = TICK.unpack_from(data, 0)
+        pos = TICK.size
+        end = len(data)
+        while pos < end:
+            op = data[pos]
+            pos += 1
+            if op == OP_HEAD:
+                player_id, cell = _ID_CELL.unpack_from(data, pos)
+                pos += _ID_CELL.size
+                self.snakes[player_id].appendleft(cell)
+                self.occupied[cell] = player_id
+            elif op == OP_TAIL:
+                player_id = data[pos]
+                pos += 1
+                cell = self.snakes[player_id].pop()
+                if self.occupied.get(cell) == player_id:
+                    del self.occupied[cell]
+            elif op == OP_FOOD:
+                cell, kind = _CELL_KIND.unpack_from(data, pos)
+                pos += _CELL_KIND.size
+                self.foods[cell] = kind
+            elif op == OP_EAT:
+                cell, = _U16.unpack_from(data, pos)
+                pos += _U16.size
+                self.foods.pop(cell, None)
+            elif op == OP_SPAWN:
+                player_id, length = data[pos], data[pos + 1]
+                pos += 2
+                cells = struct.unpack_from(f"<{length}H", data, pos)
+                pos += 2 * length
+                self._add_snake(player_id, cells)
+                self.scores.setdefault(player_id, 0)
+            elif op == OP_DIE:
+                player_id = data[pos]
+                pos += 1
+                for cell in self.snakes.pop(player_id, ()):
+                    if self.occupied.get(cell) == player_id:
+                        del self.occupied[cell]
+            elif op == OP_SCORE:
+                player_id, score = _ID_U16.unpack_from(data, pos)
+                pos += _ID_U16.size
+                self.scores[player_id] = score
+            else:
+                raise ProtocolError(f"unknown delta op {op}")
+
+    def _add_snake(self, player_id, cells):
+        self.snakes[player_id] = deque(cells)
+        for cell in cells:
+            self.occupied[cell] = player_id
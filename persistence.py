@@ -0,0 +1,147 @@
+# persistence.py
+"""
+Write-behind persistence for the small save files (highscore, achievements,
+replays, snapshots).
+
+The game thread only hands the new file contents to STORE.write(); a
+background thread merges repeated updates to the same file and writes them
+atomically (temp file + fsync + rename), so a crash never leaves a
+half-written file and disk latency never lands inside a game tick.
+"""
+import atexit
+import os
+import sys
+import tempfile
+import threading
+
+WRITE_DELAY = 1.0  # seconds to wait for more updates before writing
+
+
+def atomic_write(path, data):
+    """Replace path with data (bytes) so readers see either the old or the new file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindStore:
+    """
+    Background writer. Pending contents are keyed by path, so ten highscore
+    updates inside WRITE_DELAY become one write of the latest value.
+    """
+
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self.writes = 0
+        self.errors = 0
+        self.last_error = None
+        self._pending = {}
+        self._inflight = {}   # batch being written; still visible to pending()
+        self._flush_requested = False
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def write(self, path, data):
+        """
+        Queue data for path: bytes, str, None to remove the file, or a
+        callable returning bytes, called on the writer thread.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._cond:
+            if self._closed:
+                # Late writes (after close) go straight to disk
+                self._write_now({path: data})
+                return
+            self._pending[path] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def remove(self, path):
+        """Delete path once the writes queued before it are done."""
+        self.write(path, None)
+
+    def pending(self, path):
+        """Latest not-yet-written contents for path (b"" if it is about to be removed), or None."""
+        with self._cond:
+            if path in self._pending:
+                data = self._pending[path]
+            elif path in self._inflight:
+                data = self._inflight[path]
+            else:
+                return None
+        if callable(data):
+            data = data()
+        return b"" if data is None else data
+
+    def flush(self, wait=True, timeout=5.0):
+        """Write everything pending now; with wait=True block until it is on disk."""
+        with self._cond:
+            if not self._pending and not self._busy:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            if wait:
+                return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+            return False
+
+    def close(self):
+        self.flush(wait=True)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Give further updates a chance to merge unless a flush was requested
+                if not self._flush_requested:
+                    self._cond.wait_for(lambda: self._flush_requested or self._closed, self.delay)
+                batch = self._inflight = self._pending
+                self._pending = {}
+                self._flush_requested = False
+                self._busy = True
+            try:
+                self._write_now(batch)
+            finally:
+                with self._cond:
+                    self._inflight = {}
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write_now(self, batch):
+        for path, data in batch.items():
+            try:
+                if data is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    atomic_write(path, data() if callable(data) else data)
+                self.writes += 1
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+                print(f"Could not save {path}: {e}", file=sys.stderr)
+
+
+STORE = WriteBehindStore()
+atexit.register(STORE.close)
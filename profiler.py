@@ -0,0 +1,172 @@
+# profiler.py
+"""
+Per-frame phase profiler for SnakeGame.run().
+
+Each frame is split into named phases (events, move, draw, flip) with
+mark() calls; the profiler keeps rolling frame-time statistics and a bounded
+history that can be exported as a Chrome trace (chrome://tracing, Perfetto)
+or as CSV. InputLatency measures key press to presented frame. No pygame
+dependency.
+"""
+import csv
+import json
+import math
+import time
+from collections import deque
+
+PROFILE_TRACE_FILE = "frame_trace.json"
+PROFILE_CSV_FILE = "frame_trace.csv"
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (p in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    """
+    Usage per frame:
+
+        prof.begin_frame()
+        ...poll events...;  prof.mark("events")
+        ...move()...;       prof.mark("move")
+        ...
+        prof.end_frame()
+
+    Frames whose work time exceeds the frame budget (1 / target_fps) are
+    counted as dropped.
+    """
+
+    def __init__(self, target_fps=100, window=600, history=10000):
+        self.budget = 1.0 / target_fps if target_fps else None
+        self.frame_times = deque(maxlen=window)
+        self.frames = deque(maxlen=history)  # (start, [(phase, t0, t1), ...])
+        self.dropped = 0
+        self.frame_count = 0
+        self.origin = time.perf_counter()
+        self._frame_start = None
+        self._last = None
+        self._phases = []
+
+    def begin_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+        self._phases = []
+
+    def mark(self, phase):
+        """Close the current phase: everything since the previous mark."""
+        now = time.perf_counter()
+        self._phases.append((phase, self._last, now))
+        self._last = now
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        frame_time = time.perf_counter() - self._frame_start
+        self.frame_times.append(frame_time)
+        self.frames.append((self._frame_start, self._phases))
+        self.frame_count += 1
+        if self.budget is not None and frame_time > self.budget:
+            self.dropped += 1
+        self._frame_start = None
+
+    # --- Statistics -------------------------------------------------------
+    def stats(self):
+        """Rolling frame-time statistics in milliseconds."""
+        times = sorted(self.frame_times)
+        return {
+            "frames": self.frame_count,
+            "p50": percentile(times, 50) * 1000.0,
+            "p95": percentile(times, 95) * 1000.0,
+            "p99": percentile(times, 99) * 1000.0,
+            "max": (times[-1] if times else 0.0) * 1000.0,
+            "dropped": self.dropped,
+        }
+
+    def phase_averages(self):
+        """Mean milliseconds per phase over the recorded history."""
+        totals = {}
+        counts = {}
+        for _start, phases in self.frames:
+            for name, t0, t1 in phases:
+                totals[name] = totals.get(name, 0.0) + (t1 - t0)
+                counts[name] = counts.get(name, 0) + 1
+        return {name: totals[name] / counts[name] * 1000.0 for name in totals}
+
+    def summary_text(self):
+        s = self.stats()
+        return (f"p50 {s['p50']:.1f}  p95 {s['p95']:.1f}  p99 {s['p99']:.1f}  "
+                f"max {s['max']:.1f} ms  drop {s['dropped']}")
+
+    # --- Export -----------------------------------------------------------
+    def export_chrome_trace(self, path=PROFILE_TRACE_FILE):
+        """Write complete ("X") events in the Chrome trace-event JSON format."""
+        events = []
+        for index, (start, phases) in enumerate(self.frames):
+            end = phases[-1][2] if phases else start
+            events.append({"name": "frame", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+                           "args": {"frame": index}})
+            for name, t0, t1 in phases:
+                events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                               "ts": (t0 - self.origin) * 1e6, "dur": (t1 - t0) * 1e6})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def export_csv(self, path=PROFILE_CSV_FILE):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "phase", "start_ms", "duration_ms"])
+            for index, (_start, phases) in enumerate(self.frames):
+                for name, t0, t1 in phases:
+                    writer.writerow([index, name, f"{(t0 - self.origin) * 1000.0:.3f}",
+                                     f"{(t1 - t0) * 1000.0:.3f}"])
+        return path
+
+
+class InputLatency:
+    """
+    Key press -> first presented frame that shows the resulting move.
+
+    The game calls applied(pressed_at) when a queued direction is used by a
+    move, and presented() right after the frame is flipped. Each sample is
+    split into the wait for the next tick and the time to get it on screen.
+    """
+
+    def __init__(self, window=500):
+        self.totals = deque(maxlen=window)
+        self.waits = deque(maxlen=window)
+        self.count = 0
+        self._pending = []  # (pressed_at, applied_at)
+
+    def applied(self, pressed_at, now=None):
+        self._pending.append((pressed_at, time.perf_counter() if now is None else now))
+
+    def presented(self, now=None):
+        if not self._pending:
+            return
+        now = time.perf_counter() if now is None else now
+        for pressed_at, applied_at in self._pending:
+            self.totals.append(now - pressed_at)
+            self.waits.append(applied_at - pressed_at)
+            self.count += 1
+        self._pending.clear()
+
+    def stats(self):
+        """Rolling statistics in milliseconds."""
+        totals = sorted(self.totals)
+        waits = sorted(self.waits)
+        return {
+            "samples": self.count,
+            "p50": percentile(totals, 50) * 1000.0,
+            "p95": percentile(totals, 95) * 1000.0,
+            "max": (totals[-1] if totals else 0.0) * 1000.0,
+            "wait_p50": percentile(waits, 50) * 1000.0,
+        }
+
+    def summary_text(self):
+        s = self.stats()
+        return f"input p50 {s['p50']:.0f}  p95 {s['p95']:.0f} ms (tick wait {s['wait_p50']:.0f})"
@@ -0,0 +1,228 @@
+# replay.py
+"""
+Deterministic replays: record the direction in effect at each tick and
+re-simulate a whole game headlessly from its seed.
+
+File layout (little endian):
+
+    header   "SNKR" | version u8 | grid_w u16 | grid_h u16 | seed u64
+             | ticks u32 | score u32 | events u32
+    deltas   one unsigned LEB128 varint per event: ticks since the previous event
+    dirs     2 bits per event (UP=0, DOWN=1, LEFT=2, RIGHT=3), 4 per byte
+    resumes  count u32 | one varint per resume: ticks since the previous one
+
+A game continued from a snapshot (snapshot.py) rebuilds the engine's
+free-cell list in reset() order when it resumes; play_replay() does the same
+at the recorded ticks. Version 1 files have no resumes section.
+
+Usage:  python replay.py highscore_replay.snr   (exit 1 if the score does not verify)
+"""
+import random
+import struct
+import sys
+import time
+
+from engine import SnakeEngine, FOODS, STEP_ATE, STEP_DEAD, start_body
+
+REPLAY_MAGIC = b"SNKR"
+REPLAY_VERSION = 2
+HIGHSCORE_REPLAY_FILE = "highscore_replay.snr"
+
+_HEADER = struct.Struct("<4sBHHQIII")
+_U32 = struct.Struct("<I")
+_DIR_CODES = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+_CODE_DIRS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+
+def new_seed():
+    return random.getrandbits(64)
+
+
+# --- Varint helpers ----------------------------------------------------
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+# --- Replay data -------------------------------------------------------
+class Replay:
+    """One recorded game: board size, seed, (tick, direction) events and the result."""
+
+    def __init__(self, grid_width, grid_height, seed, events=None, ticks=0, score=0, resumes=None):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.seed = seed
+        self.events = events if events is not None else []
+        self.ticks = ticks
+        self.score = score
+        self.resumes = resumes if resumes is not None else []  # ticks a snapshot was resumed at
+
+    def to_bytes(self):
+        out = bytearray(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.grid_width, self.grid_height,
+                                     self.seed, self.ticks, self.score, len(self.events)))
+        prev = 0
+        for tick, _direction in self.events:
+            _write_varint(out, tick - prev)
+            prev = tick
+        packed = bytearray((len(self.events) + 3) // 4)
+        for i, (_tick, direction) in enumerate(self.events):
+            packed[i >> 2] |= _DIR_CODES[direction] << ((i & 3) * 2)
+        out += packed
+        out += _U32.pack(len(self.resumes))
+        prev = 0
+        for tick in self.resumes:
+            _write_varint(out, tick - prev)
+            prev = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < _HEADER.size:
+            raise ValueError("replay too short")
+        magic, version, w, h, seed, ticks, score, count = _HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC:
+            raise ValueError("not a replay file")
+        if version not in (1, REPLAY_VERSION):
+            raise ValueError(f"unsupported replay version {version}")
+        pos = _HEADER.size
+        ticks_list = []
+        tick = 0
+        for _ in range(count):
+            delta, pos = _read_varint(data, pos)
+            tick += delta
+            ticks_list.append(tick)
+        events = [(t, _CODE_DIRS[(data[pos + (i >> 2)] >> ((i & 3) * 2)) & 3])
+                  for i, t in enumerate(ticks_list)]
+        pos += (count + 3) // 4
+        resumes = []
+        if version >= 2:
+            resume_count, = _U32.unpack_from(data, pos)
+            pos += _U32.size
+            tick = 0
+            for _ in range(resume_count):
+                delta, pos = _read_varint(data, pos)
+                tick += delta
+                resumes.append(tick)
+        return cls(w, h, seed, events, ticks, score, resumes)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Collects direction changes while a game is played (see SnakeGame.move)."""
+
+    def __init__(self, grid_width, grid_height, seed, direction="RIGHT"):
+        self.replay = Replay(grid_width, grid_height, seed)
+        self.last_direction = direction
+
+    def record(self, tick, direction):
+        # Only changes are stored; the direction persists between events
+        if direction != self.last_direction:
+            self.replay.events.append((tick, direction))
+            self.last_direction = direction
+
+    def partial(self, ticks, score):
+        """Copy of the replay so far; recording carries on in this one."""
+        r = self.replay
+        return Replay(r.grid_width, r.grid_height, r.seed, list(r.events), ticks, score, list(r.resumes))
+
+    def resume(self, tick):
+        """The game was continued from a snapshot before this tick's move."""
+        self.replay.resumes.append(tick)
+
+    def finish(self, ticks, score):
+        self.replay.ticks = ticks
+        self.replay.score = score
+        return self.replay
+
+
+# --- Headless playback -------------------------------------------------
+def play_replay(replay):
+    """
+    Re-simulate a replay with the same rules and RNG stream as SnakeGame.
+    Returns (score, ticks) reached when the snake died, won or ran out of ticks.
+    """
+    rng = random.Random(replay.seed)
+    engine = SnakeEngine(replay.grid_width, replay.grid_height)
+    engine.reset(start_body(replay.grid_height), "RIGHT")
+    # SnakeGame.create_food(): free cell, then the emoji, from the same RNG
+    if engine.spawn_food(rng) is not None:
+        rng.choice(FOODS)
+
+    events = replay.events
+    next_event = 0
+    resumes = replay.resumes
+    next_resume = 0
+    score = 0
+    tick = 0
+    while tick < replay.ticks:
+        while next_resume < len(resumes) and resumes[next_resume] <= tick:
+            # Same free-cell rebuild as Snapshot.restore_engine()
+            food = engine.food
+            engine.reset(list(engine.body), engine.direction)
+            engine.food = food
+            next_resume += 1
+        while next_event < len(events) and events[next_event][0] <= tick:
+            engine.direction = events[next_event][1]
+            next_event += 1
+        result = engine.step()
+        tick += 1
+        if result == STEP_DEAD:
+            break
+        if result == STEP_ATE:
+            score += 1
+            if engine.spawn_food(rng) is None:
+                break
+            rng.choice(FOODS)
+    return score, tick
+
+
+def verify_replay(replay):
+    score, ticks = play_replay(replay)
+    return score == replay.score and ticks == replay.ticks
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python replay.py REPLAY [REPLAY ...]")
+        return 2
+    ok = True
+    for path in argv:
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        score, ticks = play_replay(replay)
+        elapsed = time.perf_counter() - start
+        verified = score == replay.score and ticks == replay.ticks
+        ok = ok and verified
+        rate = ticks / elapsed if elapsed > 0 else float("inf")
+        print(f"{path}: {replay.grid_width}x{replay.grid_height} seed={replay.seed:#x} "
+              f"score {score}/{replay.score} ticks {ticks}/{replay.ticks} "
+              f"({rate:,.0f} ticks/s) {'OK' if verified else 'MISMATCH'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
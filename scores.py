@@ -0,0 +1,172 @@
+# scores.py
+"""
+SQLite score history and leaderboard store.
+
+Every finished game is one row in `games`. Leaderboards are read a page at a
+time with keyset pagination on (score, id), which the indexes below serve
+directly, so paging stays fast on hundreds of thousands of rows. The legacy
+highscore.json / achievement files are imported once on first open.
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+
+SCORES_DB = "scores.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id        INTEGER PRIMARY KEY,
+    score     INTEGER NOT NULL,
+    length    INTEGER NOT NULL,
+    duration  REAL    NOT NULL,
+    skin      TEXT    NOT NULL,
+    seed      TEXT,
+    played_at REAL    NOT NULL,
+    day       TEXT    NOT NULL
+);
+-- rowid (id) is implicitly the last column of every index
+CREATE INDEX IF NOT EXISTS games_by_score ON games(score);
+CREATE INDEX IF NOT EXISTS games_by_skin  ON games(skin, score);
+CREATE INDEX IF NOT EXISTS games_by_day   ON games(day, score);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    threshold   INTEGER PRIMARY KEY,
+    unlocked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def today(now=None):
+    return time.strftime("%Y-%m-%d", time.localtime(now))
+
+
+class ScoreStore:
+    def __init__(self, path=SCORES_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            # WAL keeps commits cheap enough for the end of every game
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.DatabaseError:
+            pass
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Writes -----------------------------------------------------------
+    def record_game(self, score, length, duration, skin, seed=None, played_at=None):
+        played_at = time.time() if played_at is None else played_at
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO games (score, length, duration, skin, seed, played_at, day) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (score, length, duration, skin, None if seed is None else f"{seed:016x}",
+                 played_at, today(played_at)))
+        return cur.lastrowid
+
+    def unlock_achievements(self, thresholds, unlocked_at=None):
+        unlocked_at = time.time() if unlocked_at is None else unlocked_at
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO achievements (threshold, unlocked_at) VALUES (?, ?)",
+                [(t, unlocked_at) for t in thresholds])
+
+    def import_legacy(self, highscore_file, achievement_files):
+        """One-time import of the JSON/CSV save files. Returns True if it ran."""
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return False
+        highscore = 0
+        try:
+            with open(highscore_file, "r", encoding="utf-8") as f:
+                highscore = int(json.load(f).get("highscore", 0))
+        except Exception:
+            pass
+        thresholds = set()
+        for path in achievement_files:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    thresholds |= {int(line) for line in f.read().splitlines() if line.strip().isdigit()}
+            except Exception:
+                pass
+        with self.conn:
+            if highscore > 0:
+                mtime = os.path.getmtime(highscore_file)
+                self.conn.execute(
+                    "INSERT INTO games (score, length, duration, skin, seed, played_at, day) "
+                    "VALUES (?, ?, 0, 'Imported', NULL, ?, ?)",
+                    (highscore, highscore + 3, mtime, today(mtime)))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO achievements (threshold, unlocked_at) VALUES (?, ?)",
+                [(t, time.time()) for t in thresholds])
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                              (str(time.time()),))
+        return True
+
+    # --- Reads ------------------------------------------------------------
+    @staticmethod
+    def _filters(skin, day):
+        clauses, params = [], []
+        if skin is not None:
+            clauses.append("skin = ?")
+            params.append(skin)
+        if day is not None:
+            clauses.append("day = ?")
+            params.append(day)
+        return clauses, params
+
+    def leaderboard(self, limit=10, skin=None, day=None, after=None):
+        """
+        One page of games, best first. `after` is the (score, id) cursor of the
+        last row of the previous page (see page_cursor); None starts at the top.
+        """
+        clauses, params = self._filters(skin, day)
+        if after is not None:
+            clauses.append("(score, id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(
+            f"SELECT id, score, length, duration, skin, seed, played_at, day FROM games {where} "
+            f"ORDER BY score DESC, id DESC LIMIT ?", (*params, limit)).fetchall()
+
+    @staticmethod
+    def page_cursor(rows):
+        return (rows[-1]["score"], rows[-1]["id"]) if rows else None
+
+    def count(self, skin=None, day=None):
+        clauses, params = self._filters(skin, day)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(f"SELECT COUNT(*) FROM games {where}", params).fetchone()[0]
+
+    def best_score(self, skin=None, day=None):
+        rows = self.leaderboard(1, skin, day)
+        return rows[0]["score"] if rows else 0
+
+    def achievements(self):
+        """{threshold: unlocked_at} for every unlocked achievement."""
+        return {row["threshold"]: row["unlocked_at"]
+                for row in self.conn.execute("SELECT threshold, unlocked_at FROM achievements")}
+
+
+_store = None
+
+def get_score_store(path=SCORES_DB, legacy_highscore=None, legacy_achievements=()):
+    """Shared store for game.py and menu.py; imports the legacy files on first open."""
+    global _store
+    if _store is None:
+        try:
+            _store = ScoreStore(path)
+            if legacy_highscore is not None:
+                _store.import_legacy(legacy_highscore, legacy_achievements)
+        except sqlite3.Error as e:
+            print(f"Score database unavailable ({path}): {e}", file=sys.stderr)
+            return None
+    return _store
@@ -0,0 +1,423 @@
+# server.py
+"""
+Authoritative multiplayer server: many shared-board rooms per process.
+
+Each room is ticked at a fixed rate by its own asyncio task. A tick moves
+every snake with SnakeGame.move()'s rules:
+- no 180 degree turns
+- walls and every body, tails included, are solid
+- eating grows the snake by one
+Two heads meeting on one cell kill both. Dead snakes respawn after
+RESPAWN_TICKS.
+
+The tick's changes are encoded once as a DELTA frame (netproto.py) and
+the same bytes are written to every client. A client whose socket buffer
+backs up stops getting deltas and gets a fresh SNAPSHOT once it drains.
+Each room keeps tick-time metrics.
+
+    python server.py --port 7777
+    python server.py --selftest --rooms 200 --bots 4 --seconds 10   # localhost load test
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+
+import netproto
+from engine import DIRECTIONS, FOODS, OPPOSITES
+from netproto import DeltaWriter, MSG_HELLO, MSG_INPUT, CODE_DIRECTIONS
+
+DEFAULT_PORT = 7777
+TICK_RATE = 10.0          # ticks per second in every room
+GRID_WIDTH = 40
+GRID_HEIGHT = 25
+MAX_PLAYERS = 8           # per room
+RESPAWN_TICKS = 20
+MAX_CLIENT_BUFFER = 64 * 1024  # bytes queued for a client before it is resynced
+METRICS_WINDOW = 1000     # ticks kept for the per-room percentiles
+
+
+class Player:
+    def __init__(self, player_id, name, writer):
+        self.id = player_id
+        self.name = name
+        self.writer = writer
+        self.body = deque()       # flat cells, head first
+        self.direction = "RIGHT"
+        self.next_direction = "RIGHT"
+        self.alive = False
+        self.score = 0
+        self.respawn_tick = 0
+        self.needs_snapshot = False
+
+
+def check_room_size(grid_width, grid_height, max_players):
+    """
+    Raise ValueError unless every message of such a room fits the protocol:
+    u16 cells, u8 player ids, and a full-board SNAPSHOT in a single frame.
+    """
+    cells = grid_width * grid_height
+    if cells > netproto.MAX_CELLS:
+        raise ValueError("board too large for u16 cell indices")
+    if not 1 <= max_players <= netproto.MAX_PLAYER_IDS:
+        raise ValueError(f"max players must be 1..{netproto.MAX_PLAYER_IDS}")
+    if netproto.max_snapshot_payload(cells, max_players) > netproto.MAX_PAYLOAD:
+        raise ValueError(f"a full {grid_width}x{grid_height} board with {max_players} players "
+                         f"does not fit one snapshot frame")
+
+
+class Room:
+    def __init__(self, name, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 tick_rate=TICK_RATE, max_players=MAX_PLAYERS, seed=None):
+        check_room_size(grid_width, grid_height, max_players)
+        self.name = name
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.tick_rate = tick_rate
+        self.max_players = max_players
+        self.rng = random.Random(seed)
+        self.players = {}
+        self.occupied = {}   # flat cell -> player id
+        self.foods = {}      # flat cell -> index into FOODS
+        self.tick = 0
+        self.delta = DeltaWriter()
+        self.task = None
+
+        # Metrics
+        self.tick_times = deque(maxlen=METRICS_WINDOW)
+        self.late_ticks = 0
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+
+    # --- Membership -------------------------------------------------------
+    def add_player(self, name, writer):
+        if len(self.players) >= self.max_players:
+            return None
+        player_id = next(i for i in range(256) if i not in self.players)
+        player = Player(player_id, name, writer)
+        self.players[player_id] = player
+        self.spawn(player)
+        return player
+
+    def remove_player(self, player):
+        if self.players.pop(player.id, None) is not None and player.alive:
+            self.kill(player)
+
+    def snapshot(self):
+        snakes = [(p.id, p.score, list(p.body)) for p in self.players.values() if p.alive]
+        return netproto.snapshot(self.tick, snakes, self.foods)
+
+    # --- Board helpers ----------------------------------------------------
+    def _random_free_cell(self):
+        size = self.grid_width * self.grid_height
+        for _ in range(32):
+            cell = self.rng.randrange(size)
+            if cell not in self.occupied and cell not in self.foods:
+                return cell
+        free = [c for c in range(size) if c not in self.occupied and c not in self.foods]
+        return self.rng.choice(free) if free else None
+
+    def spawn(self, player):
+        """Put a fresh 3-cell snake, facing right, on a free row segment."""
+        w = self.grid_width
+        rows = list(range(self.grid_height))
+        self.rng.shuffle(rows)
+        for y in rows:
+            for x0 in self.rng.sample(range(w - 6), min(8, max(0, w - 6))):
+                # body plus three free cells ahead of the head
+                cells = [y * w + x0 + 2 - i for i in range(3)]
+                ahead = [cells[0] + i for i in range(1, 4)]
+                if all(c not in self.occupied and c not in self.foods for c in cells + ahead):
+                    player.body = deque(cells)
+                    for c in cells:
+                        self.occupied[c] = player.id
+                    player.direction = player.next_direction = "RIGHT"
+                    player.alive = True
+                    self.delta.spawn(player.id, cells)
+                    return True
+        player.respawn_tick = self.tick + RESPAWN_TICKS  # board too crowded, try later
+        return False
+
+    def kill(self, player):
+        for cell in player.body:
+            if self.occupied.get(cell) == player.id:
+                del self.occupied[cell]
+        player.body.clear()
+        player.alive = False
+        player.respawn_tick = self.tick + RESPAWN_TICKS
+        self.delta.die(player.id)
+
+    # --- Simulation -------------------------------------------------------
+    def step(self):
+        """Advance the room one tick; returns the DELTA frame for it."""
+        w, h = self.grid_width, self.grid_height
+        self.tick += 1
+        moves = {}
+        for player in self.players.values():
+            if not player.alive:
+                continue
+            if player.next_direction != OPPOSITES[player.direction]:
+                player.direction = player.next_direction
+            dx, dy = DIRECTIONS[player.direction]
+            head = player.body[0]
+            x, y = head % w + dx, head // w + dy
+            moves[player.id] = y * w + x if 0 <= x < w and 0 <= y < h else None
+
+        # Collisions use the board before anyone moves: tails are still solid
+        targets = {}
+        for player_id, cell in moves.items():
+            if cell is not None:
+                targets[cell] = targets.get(cell, 0) + 1
+        dead = [pid for pid, cell in moves.items()
+                if cell is None or cell in self.occupied or targets[cell] > 1]
+        for player_id in dead:
+            del moves[player_id]
+            self.kill(self.players[player_id])
+
+        for player_id, cell in moves.items():
+            player = self.players[player_id]
+            player.body.appendleft(cell)
+            self.occupied[cell] = player_id
+            self.delta.head(player_id, cell)
+            if cell in self.foods:
+                del self.foods[cell]
+                self.delta.eat(cell)
+                player.score += 1
+                self.delta.score(player_id, player.score)
+            else:
+                tail = player.body.pop()
+                del self.occupied[tail]
+                self.delta.tail(player_id)
+
+        for player in self.players.values():
+            if not player.alive and self.tick >= player.respawn_tick:
+                self.spawn(player)
+
+        # One food per player on the board (at least one)
+        while len(self.foods) < max(1, len(self.players)):
+            cell = self._random_free_cell()
+            if cell is None:
+                break
+            kind = self.rng.randrange(len(FOODS))
+            self.foods[cell] = kind
+            self.delta.food(cell, kind)
+
+        data = self.delta.frame(self.tick)
+        self.delta.clear()
+        return data
+
+    def broadcast(self, data):
+        snapshot = None
+        for player in self.players.values():
+            transport = player.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                # Slow reader: stop queueing deltas, resync once it drains
+                player.needs_snapshot = True
+                continue
+            if player.needs_snapshot:
+                if snapshot is None:
+                    snapshot = self.snapshot()
+                player.writer.write(snapshot)
+                self.bytes_sent += len(snapshot)
+                player.needs_snapshot = False
+                self.snapshots_sent += 1
+            else:
+                player.writer.write(data)
+                self.bytes_sent += len(data)
+
+    async def run(self):
+        """Tick at a fixed rate until the room is empty."""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while self.players:
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.late_ticks += 1
+                if delay < -5 * interval:
+                    next_tick = loop.time()  # too far behind: drop the backlog
+                await asyncio.sleep(0)
+            start = time.perf_counter()
+            self.broadcast(self.step())
+            self.tick_times.append(time.perf_counter() - start)
+
+    def metrics(self):
+        times = sorted(self.tick_times)
+        n = len(times)
+        return {
+            "room": self.name,
+            "players": len(self.players),
+            "ticks": self.tick,
+            "tick_p50_ms": times[n // 2] * 1000.0 if n else 0.0,
+            "tick_p99_ms": times[min(n - 1, int(n * 0.99))] * 1000.0 if n else 0.0,
+            "tick_max_ms": times[-1] * 1000.0 if n else 0.0,
+            "late_ticks": self.late_ticks,
+            "bytes_sent": self.bytes_sent,
+            "snapshots": self.snapshots_sent,
+        }
+
+
+class GameServer:
+    def __init__(self, host="0.0.0.0", port=DEFAULT_PORT, grid_width=GRID_WIDTH,
+                 grid_height=GRID_HEIGHT, tick_rate=TICK_RATE, max_players=MAX_PLAYERS):
+        check_room_size(grid_width, grid_height, max_players)  # fail at startup, not on a join
+        self.host = host
+        self.port = port
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.tick_rate = tick_rate
+        self.max_players = max_players
+        self.rooms = {}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # port 0 -> the one picked
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for room in self.rooms.values():
+            if room.task is not None:
+                room.task.cancel()
+
+    def room(self, name):
+        room = self.rooms.get(name)
+        if room is None:
+            room = self.rooms[name] = Room(name, self.grid_width, self.grid_height,
+                                           self.tick_rate, self.max_players)
+        return room
+
+    async def handle_client(self, reader, writer):
+        player = room = None
+        try:
+            msg_type, payload = await netproto.read_frame(reader)
+            if msg_type != MSG_HELLO:
+                return
+            room_name, name = netproto.parse_hello(payload)
+            room = self.room(room_name)
+            player = room.add_player(name, writer)
+            if player is None:
+                return  # room full
+            writer.write(netproto.frame(netproto.MSG_WELCOME, netproto.WELCOME.pack(
+                player.id, room.grid_width, room.grid_height, room.tick_rate)))
+            # The join is in the room's pending delta too; the snapshot covers it
+            player.needs_snapshot = True
+            if room.task is None or room.task.done():
+                room.task = asyncio.create_task(room.run())
+
+            while True:
+                msg_type, payload = await netproto.read_frame(reader)
+                if msg_type == MSG_INPUT and payload and payload[0] < len(CODE_DIRECTIONS):
+                    player.next_direction = CODE_DIRECTIONS[payload[0]]
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except netproto.ProtocolError as e:
+            print(f"dropping client {writer.get_extra_info('peername')}: {e}", file=sys.stderr)
+        finally:
+            if player is not None:
+                room.remove_player(player)
+                if not room.players:
+                    self.rooms.pop(room.name, None)
+            writer.close()
+
+    def metrics(self):
+        return [room.metrics() for room in self.rooms.values()]
+
+
+def summarize(metrics):
+    """One line over all rooms: worst p99/max tick time and total traffic."""
+    if not metrics:
+        return "no rooms"
+    ticks = sum(m["ticks"] for m in metrics)
+    return (f"{len(metrics)} rooms, {sum(m['players'] for m in metrics)} players, {ticks} ticks | "
+            f"tick p50 {max(m['tick_p50_ms'] for m in metrics):.3f} ms, "
+            f"p99 {max(m['tick_p99_ms'] for m in metrics):.3f} ms, "
+            f"max {max(m['tick_max_ms'] for m in metrics):.3f} ms (worst room) | "
+            f"late {sum(m['late_ticks'] for m in metrics)} | "
+            f"{sum(m['bytes_sent'] for m in metrics) / max(1, ticks):.0f} B/tick/room, "
+            f"snapshots {sum(m['snapshots'] for m in metrics)}")
+
+
+async def selftest(rooms, bots, seconds, tick_rate, grid_width, grid_height):
+    """Server + simulated clients on localhost; checks every client's board."""
+    from netclient import Bot
+
+    server = await GameServer("127.0.0.1", 0, grid_width, grid_height, tick_rate).start()
+    print(f"selftest: {rooms} rooms x {bots} bots on 127.0.0.1:{server.port} for {seconds} s",
+          file=sys.stderr)
+    stop = asyncio.Event()
+    clients = [Bot(f"room{r}", f"bot{b}", seed=r * bots + b) for r in range(rooms) for b in range(bots)]
+    tasks = [asyncio.create_task(bot.run("127.0.0.1", server.port, stop)) for bot in clients]
+    await asyncio.sleep(seconds)
+
+    # Freeze every room, let the last frames arrive, then compare boards
+    for room in server.rooms.values():
+        room.task.cancel()
+    await asyncio.sleep(0.5)
+    metrics = server.metrics()
+    mismatches = 0
+    for bot in clients:
+        room = server.rooms.get(bot.room)
+        if room is None or bot.mirror is None:
+            mismatches += 1
+            continue
+        snakes = {p.id: list(p.body) for p in room.players.values() if p.alive}
+        if ({pid: list(cells) for pid, cells in bot.mirror.snakes.items()} != snakes
+                or bot.mirror.foods != room.foods or bot.mirror.tick != room.tick):
+            mismatches += 1
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await server.close()
+    print(summarize(metrics))
+    print(f"board check: {len(clients) - mismatches}/{len(clients)} clients match the server")
+    return 1 if mismatches else 0
+
+
+async def serve(args):
+    server = await GameServer(args.host, args.port, args.width, args.height, args.tick_rate).start()
+    print(f"listening on {args.host}:{server.port}", file=sys.stderr)
+    while True:
+        await asyncio.sleep(args.stats_interval)
+        print(summarize(server.metrics()), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snake multiplayer server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--tick-rate", type=float, default=TICK_RATE)
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="seconds between metric lines")
+    parser.add_argument("--selftest", action="store_true", help="run simulated clients on localhost")
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--bots", type=int, default=4, help="simulated clients per room")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    try:
+        check_room_size(args.width, args.height, MAX_PLAYERS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.selftest:
+        return asyncio.run(selftest(args.rooms, args.bots, args.seconds, args.tick_rate,
+                                    args.width, args.height))
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
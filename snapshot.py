@@ -0,0 +1,157 @@
+# snapshot.py
+"""
+Save / resume snapshots of a game in progress.
+
+A snapshot holds everything needed to carry on where the game stopped:
+the body, direction, food, score, play time, the RNG state and the replay
+recorded so far. The engine's free-cell list is not stored; loading rebuilds
+it from the body in reset()'s order (O(cells), once). Food spawns index into
+that list, so the resume is marked in the replay and play_replay() rebuilds
+it at the same tick: the finished game's replay still verifies.
+
+File layout (little endian):
+
+    header   "SNKS" | version u8 | grid_w u16 | grid_h u16 | seed u64 | tick u32
+             | score u32 | start_highscore u32 | play_time f64 | direction u8
+             | flags u8 | food_cell u32 | food_kind u8 | body u32 | replay u32
+    body     flat cells (y * grid_w + x), head first
+    rng      Mersenne Twister state: 625 u32 | gauss_next f64 (NaN if unset)
+    replay   the replay so far, in replay.py's format (replay bytes)
+
+Cells are u16, or u32 on boards with more than 65536 cells, so a snapshot
+is 2-4 bytes per segment plus 2.5 KB of RNG state and the replay.
+
+Taking a snapshot only copies the body, RNG state and replay; to_bytes()
+does the packing and is meant to run on the persistence thread (see
+SnakeGame.save_snapshot). The copy is still O(length): bench.py's
+snapshot_save is well under 1 ms on fullscreen boards and about 10 ms for
+a 500,000-segment snake on a 1000x1000 big board, so SnakeGame.autosave()
+skips the periodic snapshot above AUTOSAVE_MAX_COPY segments and events.
+"""
+import math
+import struct
+import sys
+from array import array
+
+from replay import Replay
+
+SNAPSHOT_MAGIC = b"SNKS"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_FILE = "savegame.sns"
+
+_HEADER = struct.Struct("<4sBHHQIIIdBBIBII")
+_GAUSS = struct.Struct("<d")
+_DIR_CODES = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+_CODE_DIRS = ["UP", "DOWN", "LEFT", "RIGHT"]
+_RNG_WORDS = 625   # random.Random.getstate()[1]: 624 state words + position
+
+FLAG_ASSISTED = 1
+FLAG_FOOD = 2
+
+
+def _cell_array(grid_width, grid_height, values=()):
+    return array("H" if grid_width * grid_height <= 0x10000 else "I", values)
+
+
+def _little_endian(arr):
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class Snapshot:
+    """One game in progress; cells are flat indices (y * grid_width + x)."""
+
+    def __init__(self, grid_width, grid_height, seed, tick, score, start_highscore, play_time,
+                 direction, assisted, food, body, rng_state, replay):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.seed = seed
+        self.tick = tick
+        self.score = score
+        self.start_highscore = start_highscore
+        self.play_time = play_time
+        self.direction = direction
+        self.assisted = assisted
+        self.food = food              # (flat cell, kind index) or None
+        self.body = body              # head first: array of flat cells, or (x, y) cells from an engine
+        self.rng_state = rng_state    # random.Random.getstate()
+        self.replay = replay          # Replay recorded so far
+
+    @classmethod
+    def from_engine(cls, engine, rng, replay, food=None, **fields):
+        """
+        Capture an engine's board; replay must be a copy the game will not
+        extend. fields are the remaining constructor arguments.
+        """
+        return cls(engine.grid_width, engine.grid_height, food=food, body=list(engine.body),
+                   rng_state=rng.getstate(), replay=replay, direction=engine.direction, **fields)
+
+    def flat_body(self):
+        if isinstance(self.body, array):
+            return self.body
+        w = self.grid_width
+        return _cell_array(w, self.grid_height, [y * w + x for x, y in self.body])
+
+    def restore_engine(self, engine):
+        """Put the board back on an engine of the same size (free cells in reset() order)."""
+        w = self.grid_width
+        body = [(c % w, c // w) for c in self.body] if isinstance(self.body, array) else self.body
+        engine.reset(body, self.direction)
+        engine.food = (self.food[0] % w, self.food[0] // w) if self.food else None
+
+    def to_bytes(self):
+        food_cell, food_kind = self.food if self.food else (0, 0)
+        flags = (FLAG_ASSISTED if self.assisted else 0) | (FLAG_FOOD if self.food else 0)
+        replay = self.replay.to_bytes()
+        version, words, gauss = self.rng_state
+        out = bytearray(_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.grid_width, self.grid_height, self.seed,
+            self.tick, self.score, self.start_highscore, self.play_time, _DIR_CODES[self.direction],
+            flags, food_cell, food_kind, len(self.body), len(replay)))
+        out += _little_endian(self.flat_body()).tobytes()
+        out += _little_endian(array("I", words)).tobytes()
+        out += _GAUSS.pack(math.nan if gauss is None else gauss)
+        out += replay
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < _HEADER.size:
+            raise ValueError("snapshot too short")
+        (magic, version, w, h, seed, tick, score, start_highscore, play_time, direction,
+         flags, food_cell, food_kind, body_len, replay_len) = _HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a snapshot file")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        cells = w * h
+        if not 0 < body_len <= cells or direction > 3:
+            raise ValueError("corrupt snapshot")
+        pos = _HEADER.size
+        body = _cell_array(w, h)
+        body_end = pos + body_len * body.itemsize
+        rng_end = body_end + _RNG_WORDS * 4
+        if len(data) != rng_end + _GAUSS.size + replay_len:
+            raise ValueError("snapshot size does not match its header")
+        body.frombytes(data[pos:body_end])
+        words = array("I")
+        words.frombytes(data[body_end:rng_end])
+        _little_endian(body)
+        _little_endian(words)
+        taken = set(body)
+        if len(taken) != body_len or max(body) >= cells:
+            raise ValueError("corrupt snapshot body")
+        if flags & FLAG_FOOD and (food_cell >= cells or food_cell in taken):
+            raise ValueError("corrupt snapshot food")
+        gauss, = _GAUSS.unpack_from(data, rng_end)
+        rng_state = (3, tuple(words), None if math.isnan(gauss) else gauss)
+        replay = Replay.from_bytes(data[rng_end + _GAUSS.size:])
+        food = (food_cell, food_kind) if flags & FLAG_FOOD else None
+        return cls(w, h, seed, tick, score, start_highscore, play_time, _CODE_DIRS[direction],
+                   bool(flags & FLAG_ASSISTED), food, body, rng_state, replay)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,46 @@
+# startup.py
+"""
+Time-to-first-frame instrumentation (menu.py --startup-timing).
+
+Import this module first; STARTUP.mark(name) records how long each startup
+step took and the report is printed once the first menu frame is presented.
+Marks from background loading that arrive later are printed as they happen.
+"""
+import sys
+import threading
+import time
+
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self.enabled = False
+        self.reported = False
+        self._lock = threading.Lock()  # marks also arrive from loader threads
+
+    def mark(self, name):
+        now = time.perf_counter()
+        with self._lock:
+            self.marks.append((name, now))
+            if self.enabled and self.reported:
+                print(f"  {name:<24} {(now - self.t0) * 1000:8.1f} ms (background)", file=sys.stderr)
+
+    def first_frame(self):
+        if self.reported:
+            return
+        self.mark("first frame")
+        with self._lock:
+            self.reported = True
+            if self.enabled:
+                self.report()
+
+    def report(self, file=sys.stderr):
+        print("startup timing (step / since start):", file=file)
+        prev = self.t0
+        for name, t in list(self.marks):
+            print(f"  {name:<24} {(t - prev) * 1000:8.1f} ms {(t - self.t0) * 1000:8.1f} ms", file=file)
+            prev = t
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,277 @@
+# vecenv.py
+"""
+Vectorized training environment: N boards stepped in lockstep with NumPy.
+
+State lives in flat arrays: a uint8 board per env (0 empty, 1 body, 2 head,
+3 food), each body as a ring buffer of cell indices with head/tail
+positions, plus direction, food, score and step counters. step() applies
+one action per env with whole-array operations. Envs that end are reset
+in the same call.
+
+The rules are SnakeGame.move()'s. A 180 degree turn is ignored, as in
+change_direction(). The tail still counts as occupied when the head moves.
+Eating grows the snake by one. Food goes on a uniformly random free cell,
+and a full board is a win. `python vecenv.py --verify` replays random and
+greedy play on SnakeEngine boards and compares every step.
+
+Needs NumPy (not required by the game itself).
+
+    env = VecSnakeEnv(4096, 20, 15, seed=0)
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(actions)
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine import start_body
+
+# Actions / directions, same codes as replay files
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+UP, DOWN, LEFT, RIGHT = range(4)
+_DX = np.array([0, 0, -1, 1], dtype=np.int32)
+_DY = np.array([-1, 1, 0, 0], dtype=np.int32)
+_OPPOSITE = np.array([DOWN, UP, RIGHT, LEFT], dtype=np.int8)
+
+# Board cell values
+EMPTY, BODY, HEAD, FOOD = 0, 1, 2, 3
+
+FOOD_TRIES = 8  # rejection-sampling rounds before scanning the board for free cells
+
+
+class VecSnakeEnv:
+    """
+    Gym-style batch of snake boards.
+
+    Observations are zero-copy: `obs` is the env's own (N, H, W) uint8
+    board array, updated in place by the next step(). Copy it if you need
+    to keep it. Envs that end in a step are reset right away, so `obs`
+    already shows their new game. The final score is in
+    info["final_score"].
+    """
+
+    def __init__(self, num_envs, grid_width=20, grid_height=15, seed=None, max_stall=None):
+        self.num_envs = num_envs
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.cells = grid_width * grid_height
+        # Truncate games that go this many steps without eating (None = never)
+        self.max_stall = max_stall
+        self.num_actions = len(ACTIONS)
+        self.rng = np.random.default_rng(seed)
+
+        self.grid = np.zeros((num_envs, grid_height, grid_width), dtype=np.uint8)
+        self._flat = self.grid.reshape(num_envs, self.cells)  # same memory, one row per env
+        # Ring buffer of flat cell indices, tail at tail_idx .. head at head_idx
+        self.body = np.zeros((num_envs, self.cells), dtype=np.int32)
+        self.head_idx = np.zeros(num_envs, dtype=np.int64)
+        self.tail_idx = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int32)
+        self.head = np.zeros(num_envs, dtype=np.int32)        # flat index of the head
+        self.direction = np.zeros(num_envs, dtype=np.int8)
+        self.food = np.full(num_envs, -1, dtype=np.int32)      # flat index, -1 = none
+        self.score = np.zeros(num_envs, dtype=np.int32)
+        self.steps = np.zeros(num_envs, dtype=np.int32)
+        self.since_food = np.zeros(num_envs, dtype=np.int32)
+
+        start = [y * grid_width + x for x, y in reversed(start_body(grid_height))]  # tail first
+        if max(x for x, _ in start_body(grid_height)) >= grid_width or grid_height < 3:
+            raise ValueError(f"a {grid_width}x{grid_height} board cannot hold the start position")
+        self._start = np.array(start, dtype=np.int32)
+        self._all = np.arange(num_envs)
+
+    # --- Gym-style API ----------------------------------------------------
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_envs(self._all)
+        return self.grid, {}
+
+    def step(self, actions):
+        """
+        actions: N direction codes (UP, DOWN, LEFT, RIGHT).
+        Returns (obs, reward, terminated, truncated, info); reward is +1 for
+        eating, -1 for dying, 0 otherwise.
+        """
+        actions = np.asarray(actions, dtype=np.int8)
+        w = self.grid_width
+        # change_direction(): a 180 degree turn keeps the current direction
+        self.direction = np.where(actions == _OPPOSITE[self.direction], self.direction, actions)
+
+        x = self.head % w + _DX[self.direction]
+        y = self.head // w + _DY[self.direction]
+        inside = (x >= 0) & (x < w) & (y >= 0) & (y < self.grid_height)
+        new_head = np.where(inside, y * w + x, 0).astype(np.int32)
+        # The tail still counts as occupied: collide before it moves
+        hit = self._flat[self._all, new_head]
+        dead = ~inside | (hit == BODY) | (hit == HEAD)
+        ate = ~dead & (new_head == self.food)
+
+        # Tail moves unless the snake grows
+        moving = np.flatnonzero(~dead & ~ate)
+        self._flat[moving, self.body[moving, self.tail_idx[moving]]] = EMPTY
+        self.tail_idx[moving] = (self.tail_idx[moving] + 1) % self.cells
+
+        # Head moves
+        alive = np.flatnonzero(~dead)
+        self._flat[alive, self.head[alive]] = BODY
+        self._flat[alive, new_head[alive]] = HEAD
+        self.head_idx[alive] = (self.head_idx[alive] + 1) % self.cells
+        self.body[alive, self.head_idx[alive]] = new_head[alive]
+        self.head[alive] = new_head[alive]
+
+        self.steps += 1
+        self.since_food += 1
+        self.length[ate] += 1
+        self.score[ate] += 1
+        self.since_food[ate] = 0
+        won = ate & (self.length == self.cells)
+        self._spawn_food(np.flatnonzero(ate & ~won))
+
+        reward = ate.astype(np.float32) - dead.astype(np.float32)
+        terminated = dead | won
+        if self.max_stall is not None:
+            truncated = ~terminated & (self.since_food >= self.max_stall)
+        else:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+        done = np.flatnonzero(terminated | truncated)
+        info = {"won": won}
+        if len(done):
+            info["final_score"] = self.score.copy()
+            self._reset_envs(done)
+        return self.grid, reward, terminated, truncated, info
+
+    # --- Internals --------------------------------------------------------
+    def _reset_envs(self, idx):
+        self._flat[idx] = EMPTY
+        n = len(self._start)
+        self.body[idx, :n] = self._start
+        self._flat[idx[:, None], self._start[:-1]] = BODY
+        self._flat[idx, self._start[-1]] = HEAD
+        self.tail_idx[idx] = 0
+        self.head_idx[idx] = n - 1
+        self.length[idx] = n
+        self.head[idx] = self._start[-1]
+        self.direction[idx] = RIGHT
+        self.score[idx] = 0
+        self.steps[idx] = 0
+        self.since_food[idx] = 0
+        self._spawn_food(idx)
+
+    def _spawn_food(self, idx):
+        """Uniformly random free cell for each env in idx (all have one)."""
+        pending = idx
+        for _ in range(FOOD_TRIES):
+            if not len(pending):
+                break
+            cells = self.rng.integers(0, self.cells, size=len(pending), dtype=np.int32)
+            free = self._flat[pending, cells] == EMPTY
+            self.food[pending[free]] = cells[free]
+            pending = pending[~free]
+        # Crowded boards: pick among the remaining free cells directly
+        for i in pending:
+            self.food[i] = self.rng.choice(np.flatnonzero(self._flat[i] == EMPTY))
+        self._flat[idx, self.food[idx]] = FOOD
+
+    # --- Debug views ------------------------------------------------------
+    def snake_cells(self, i):
+        """Body of env i as (x, y) cells, head first (like SnakeEngine.body)."""
+        n = self.length[i]
+        ring = (self.head_idx[i] - np.arange(n)) % self.cells
+        return [(int(c) % self.grid_width, int(c) // self.grid_width) for c in self.body[i, ring]]
+
+    def food_cell(self, i):
+        f = int(self.food[i])
+        return None if f < 0 else (f % self.grid_width, f // self.grid_width)
+
+
+# --- Verification against SnakeEngine -------------------------------------
+def verify(num_envs=64, grid_width=10, grid_height=8, steps=20000, seed=0):
+    """
+    Drive SnakeEngine boards with the same actions (half random, half
+    greedy) and the env's food cells; return the number of mismatches.
+    """
+    from batch import GreedyPolicy
+    from engine import SnakeEngine, STEP_ATE, STEP_DEAD
+
+    env = VecSnakeEnv(num_envs, grid_width, grid_height, seed=seed)
+    env.reset()
+    rng = np.random.default_rng(seed + 1)
+    greedy = GreedyPolicy(grid_width, grid_height)
+    engines = []
+    for i in range(num_envs):
+        engine = SnakeEngine(grid_width, grid_height)
+        engine.reset(start_body(grid_height), "RIGHT")
+        engine.place_food(env.food_cell(i))
+        engines.append(engine)
+
+    scores = [0] * num_envs
+    mismatches = 0
+    for _ in range(steps):
+        actions = rng.integers(0, 4, size=num_envs).astype(np.int8)
+        for i in range(0, num_envs, 2):
+            actions[i] = ACTIONS.index(greedy.decide(engines[i]))
+        expected = []
+        for engine, action in zip(engines, actions):
+            engine.change_direction(ACTIONS[action])
+            expected.append(engine.step())
+        _, _, terminated, _, info = env.step(actions)
+
+        for i, engine in enumerate(engines):
+            result = expected[i]
+            won = result == STEP_ATE and len(engine) == engine.grid_width * engine.grid_height
+            if terminated[i] != (result == STEP_DEAD or won):
+                mismatches += 1
+                print(f"env {i}: engine {result}, env terminated={terminated[i]}", file=sys.stderr)
+            if result == STEP_ATE:
+                scores[i] += 1
+            if terminated[i]:
+                if info["final_score"][i] != scores[i]:
+                    mismatches += 1
+                    print(f"env {i}: final score {info['final_score'][i]}, engine {scores[i]}", file=sys.stderr)
+                scores[i] = 0
+                engine.reset(start_body(grid_height), "RIGHT")
+                engine.place_food(env.food_cell(i))
+                continue
+            board = set(zip(*np.nonzero(env.grid[i].T)))
+            if (env.snake_cells(i) != list(engine.body) or env.score[i] != scores[i]
+                    or board != engine.occupied | {env.food_cell(i)}):
+                mismatches += 1
+                print(f"env {i}: state differs", file=sys.stderr)
+            if result == STEP_ATE:
+                engine.place_food(env.food_cell(i))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vectorized snake environment")
+    parser.add_argument("--verify", action="store_true", help="compare against SnakeEngine")
+    parser.add_argument("--envs", type=int, default=4096)
+    parser.add_argument("--grid", help="WIDTHxHEIGHT (default 20x15, or 10x8 with --verify)")
+    parser.add_argument("--steps", type=int, default=1000)
+    args = parser.parse_args(argv)
+    grid = args.grid or ("10x8" if args.verify else "20x15")
+    grid_width, grid_height = (int(v) for v in grid.lower().split("x"))
+
+    if args.verify:
+        mismatches = verify(grid_width=grid_width, grid_height=grid_height, steps=args.steps)
+        print(f"verify: {mismatches} mismatches")
+        return 1 if mismatches else 0
+
+    env = VecSnakeEnv(args.envs, grid_width, grid_height, seed=0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 4, size=(args.steps, args.envs)).astype(np.int8)
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.perf_counter() - start
+    print(f"{args.envs} envs x {args.steps} steps on {grid_width}x{grid_height}: "
+          f"{args.envs * args.steps / elapsed:,.0f} env-steps/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# viewport.py
+"""
+Camera and chunked rendering for boards larger than the screen.
+
+The board is split into CHUNK_CELLS x CHUNK_CELLS chunks. Each chunk is
+pre-rendered once onto its own surface and kept in an LRU cache. A tick
+only repaints the cells it changed, and only on chunks that are cached.
+A frame blits the chunks that overlap the camera's view. Its cost depends
+on the viewport size, not on the board size or the snake length.
+
+What goes in a cell is up to the caller: ChunkedBoard takes
+filled(cell) -> bool and paint(surface, rect, cell) callbacks.
+"""
+from collections import OrderedDict
+
+import pygame
+
+CHUNK_CELLS = 8          # chunk edge in cells
+CHUNK_CACHE_FACTOR = 4   # cached chunks per chunk the view can show at once
+DEADZONE = 0.25          # the head may stray this fraction of the view from the center
+
+
+class Camera:
+    """Top-left corner of the view in board pixels, clamped to the board."""
+
+    def __init__(self, view_width, view_height, board_width, board_height):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.board_width = board_width
+        self.board_height = board_height
+        self.x = 0
+        self.y = 0
+
+    def center_on(self, px, py):
+        self.x = self._clamp(px - self.view_width // 2, self.board_width, self.view_width)
+        self.y = self._clamp(py - self.view_height // 2, self.board_height, self.view_height)
+
+    def follow(self, px, py):
+        """Scroll just enough to keep (px, py) inside the central dead zone."""
+        mx = int(self.view_width * DEADZONE)
+        my = int(self.view_height * DEADZONE)
+        x, y = self.x, self.y
+        if px < x + mx:
+            x = px - mx
+        elif px > x + self.view_width - mx:
+            x = px - self.view_width + mx
+        if py < y + my:
+            y = py - my
+        elif py > y + self.view_height - my:
+            y = py - self.view_height + my
+        self.x = self._clamp(x, self.board_width, self.view_width)
+        self.y = self._clamp(y, self.board_height, self.view_height)
+
+    @staticmethod
+    def _clamp(value, board, view):
+        if board <= view:
+            return (board - view) // 2  # small board: keep it centered
+        return max(0, min(value, board - view))
+
+
+class ChunkedBoard:
+    def __init__(self, grid_width, grid_height, cell_size, view_rect, filled, paint,
+                 background=(40, 40, 40), border=(200, 200, 200)):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.cell_size = cell_size
+        self.view_rect = pygame.Rect(view_rect)   # play area on the screen
+        self.filled = filled
+        self.paint = paint
+        self.background = background
+        self.border = border
+        self.camera = Camera(self.view_rect.width, self.view_rect.height,
+                             grid_width * cell_size, grid_height * cell_size)
+        self.chunk_px = CHUNK_CELLS * cell_size
+        across = self.view_rect.width // self.chunk_px + 2
+        down = self.view_rect.height // self.chunk_px + 2
+        self.max_chunks = across * down * CHUNK_CACHE_FACTOR
+        self.chunks = OrderedDict()   # (cx, cy) -> Surface, least recently shown first
+        self.renders = 0
+
+    def invalidate(self):
+        self.chunks.clear()
+
+    def update(self, cells):
+        """Repaint changed cells on the chunks that are cached."""
+        size = self.cell_size
+        for x, y in cells:
+            surf = self.chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+            if surf is None:
+                continue
+            rect = pygame.Rect((x % CHUNK_CELLS) * size, (y % CHUNK_CELLS) * size, size, size)
+            surf.fill(self.background, rect)
+            if self.filled((x, y)):
+                self.paint(surf, rect, (x, y))
+
+    def _chunk(self, cx, cy):
+        key = (cx, cy)
+        surf = self.chunks.get(key)
+        if surf is not None:
+            self.chunks.move_to_end(key)
+            return surf
+        surf = pygame.Surface((self.chunk_px, self.chunk_px))
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        surf.fill(self.background)
+        size = self.cell_size
+        x0, y0 = cx * CHUNK_CELLS, cy * CHUNK_CELLS
+        for y in range(y0, min(y0 + CHUNK_CELLS, self.grid_height)):
+            for x in range(x0, min(x0 + CHUNK_CELLS, self.grid_width)):
+                if self.filled((x, y)):
+                    self.paint(surf, pygame.Rect((x - x0) * size, (y - y0) * size, size, size), (x, y))
+        self.chunks[key] = surf
+        self.renders += 1
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surf
+
+    def draw(self, screen, follow_cell=None):
+        """Blit the visible chunks; the camera follows follow_cell (board cell) if given."""
+        size = self.cell_size
+        camera = self.camera
+        if follow_cell is not None:
+            camera.follow(follow_cell[0] * size + size // 2, follow_cell[1] * size + size // 2)
+        view = self.view_rect
+        board_px = pygame.Rect(view.x - camera.x, view.y - camera.y,
+                               self.grid_width * size, self.grid_height * size)
+        if not board_px.contains(view):
+            screen.fill(self.background, view)
+        previous_clip = screen.get_clip()
+        screen.set_clip(view)
+        cx0 = max(0, camera.x // self.chunk_px)
+        cy0 = max(0, camera.y // self.chunk_px)
+        cx1 = min((self.grid_width - 1) // CHUNK_CELLS, (camera.x + view.width - 1) // self.chunk_px)
+        cy1 = min((self.grid_height - 1) // CHUNK_CELLS, (camera.y + view.height - 1) // self.chunk_px)
+        screen.blits([(self._chunk(cx, cy), (board_px.x + cx * self.chunk_px, board_px.y + cy * self.chunk_px))
+                      for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)], doreturn=False)
+        pygame.draw.rect(screen, self.border, board_px, 2)
+        screen.set_clip(previous_clip)
+
+    def to_screen(self, cell):
+        """Screen rect of a board cell (it may lie outside the view)."""
+        size = self.cell_size
+        return pygame.Rect(self.view_rect.x + cell[0] * size - self.camera.x,
+                           self.view_rect.y + cell[1] * size - self.camera.y, size, size)
+
+    def draw_marker(self, screen, cell, color):
+        """Dot on the view's edge pointing at an off-screen cell."""
+        rect = self.to_screen(cell)
+        view = self.view_rect
+        if view.colliderect(rect):
+            return
+        r = self.cell_size // 4
+        x = max(view.left + r, min(rect.centerx, view.right - r))
+        y = max(view.top + r, min(rect.centery, view.bottom - r))
+        pygame.draw.circle(screen, color, (x, y), r)